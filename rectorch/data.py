@@ -25,15 +25,22 @@ Research paper: `Variational Autoencoders for Collaborative Filtering
 Module:
 :mod:`configuration`
 """
+import hashlib
+import io
+import json
 import logging
 import os
 import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 from scipy import sparse
 from .configuration import DataConfig
 
-__all__ = ['DataProcessing', 'DataReader', 'DatasetManager']
+__all__ = ['DataProcessing', 'DataReader', 'DatasetManager', 'IdMap', 'SequenceStore',
+           'StackedCSR']
 
 logging.basicConfig(level=logging.INFO,
                     format="[%(asctime)s]  %(message)s",
@@ -42,6 +49,314 @@ logging.basicConfig(level=logging.INFO,
 
 logger = logging.getLogger(__name__)
 
+_SPLITS = ['train', 'validation_tr', 'validation_te', 'test_tr', 'test_te']
+_FINGERPRINT = 'fingerprint.json'
+_DELTAS = 'deltas.json'
+_SHARDS = 'shards.json'
+_ID_DTYPES = 'id_dtypes.json'
+# configuration keys which only affect the loading of the pre-processed data set
+_LOADING_KEYS = ['mmap', 'n_jobs', 'proxy', 'proxy_buckets']
+_BLOCK_SIZE = 1 << 22
+_QUANTILES = [('min', 0.), ('25%', .25), ('50%', .5), ('75%', .75), ('90%', .9), ('99%', .99),
+              ('max', 1.)]
+
+
+def _train_csr(data, n_items, topn, dtype=None):
+    n_users = data['uid'].max() + 1
+    rows, cols = data['uid'], data['iid']
+    if topn:
+        values = np.ones_like(rows)
+    else:
+        values = data[data.columns.values[2]]
+
+    return sparse.csr_matrix((values, (rows, cols)),
+                             dtype=dtype or 'float64',
+                             shape=(n_users, n_items))
+
+
+def _compact_uids(uids, deltas):
+    # the users added by DataProcessing.append follow the training users in the training
+    # matrix, i.e., the internal ids of the validation and test users are skipped
+    if deltas is None:
+        return uids
+    first_new = deltas['train_users'] + deltas['heldout_users']
+    return np.where(uids >= first_new, uids - deltas['heldout_users'], uids)
+
+
+def _csv_row_counts(paths, chunksize, deltas=None):
+    # number of ratings of each user in the csv files, read one chunk at a time
+    counts = np.zeros(0, dtype='int64')
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=['uid'], chunksize=chunksize):
+            chunk_counts = np.bincount(_compact_uids(chunk['uid'].values, deltas))
+            if len(chunk_counts) > len(counts):
+                counts = np.r_[counts, np.zeros(len(chunk_counts) - len(counts), dtype='int64')]
+            counts[:len(chunk_counts)] += chunk_counts
+    return counts
+
+
+def _csv_csr(paths, counts, n_items, topn, dtype=None, chunksize=None, first=0, deltas=None):
+    # same as _train_csr, for the rows [first, first + len(counts)), but the csv files are read
+    # one chunk at a time and the ratings are copied into the preallocated arrays
+    indptr = np.zeros(len(counts) + 1, dtype='int64')
+    np.cumsum(counts, out=indptr[1:])
+    n_max = max(len(counts), n_items, indptr[-1])
+    idx_dtype = 'int32' if n_max < np.iinfo('int32').max else 'int64'
+    indices = np.empty(indptr[-1], dtype=idx_dtype)
+    data = np.ones(indptr[-1], dtype=dtype or 'float64')
+
+    cursor = indptr[:-1].copy()
+    for path in paths:
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            rows = _compact_uids(chunk['uid'].values, deltas) - first
+            keep = (rows >= 0) & (rows < len(counts))
+            order = np.argsort(rows[keep], kind='mergesort')
+            rows = rows[keep][order]
+            starts, sizes = _group_offsets(rows)
+            pos = cursor[rows] + np.arange(len(rows)) - np.repeat(starts, sizes)
+            indices[pos] = chunk['iid'].values[keep][order]
+            if not topn:
+                data[pos] = chunk[chunk.columns.values[2]].values[keep][order]
+            cursor[rows[starts]] += sizes
+
+    matrix = sparse.csr_matrix((data, indices, indptr.astype(idx_dtype)),
+                               shape=(len(counts), n_items),
+                               copy=False)
+    matrix.sum_duplicates()
+    return matrix
+
+
+def _train_test_csr(data_tr, data_te, n_items, topn, dtype=None):
+    start_idx = min(data_tr['uid'].min(), data_te['uid'].min())
+    end_idx = max(data_tr['uid'].max(), data_te['uid'].max())
+
+    rows_tr, cols_tr = data_tr['uid'] - start_idx, data_tr['iid']
+    rows_te, cols_te = data_te['uid'] - start_idx, data_te['iid']
+
+    if topn:
+        values_tr = np.ones_like(rows_tr)
+        values_te = np.ones_like(rows_te)
+    else:
+        values_tr = data_tr[data_tr.columns.values[2]]
+        values_te = data_te[data_tr.columns.values[2]]
+
+    data_tr = sparse.csr_matrix((values_tr, (rows_tr, cols_tr)),
+                                dtype=dtype or 'float64',
+                                shape=(end_idx - start_idx + 1, n_items))
+    data_te = sparse.csr_matrix((values_te, (rows_te, cols_te)),
+                                dtype=dtype or 'float64',
+                                shape=(end_idx - start_idx + 1, n_items))
+
+    tr_idx = np.diff(data_tr.indptr) != 0
+    #te_idx = np.diff(data_te.indptr) != 0
+    #keep_idx = tr_idx * te_idx
+    return data_tr[tr_idx], data_te[tr_idx]
+
+
+def _shard_bounds(indptr, num_shards):
+    # contiguous ranges of rows with (roughly) the same number of ratings
+    bounds = np.searchsorted(indptr, np.linspace(0, indptr[-1], num_shards + 1)[1:-1])
+    return [0] + bounds.tolist() + [len(indptr) - 1]
+
+
+def _pad_csr(matrix, shape):
+    # enlarge the matrix with empty rows/columns without copying its arrays
+    indptr = np.r_[matrix.indptr, np.full(shape[0] - matrix.shape[0], matrix.nnz)]
+    indptr = indptr.astype(matrix.indptr.dtype, copy=False)
+    return sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=shape, copy=False)
+
+
+def _merge_rows(blocks, n_cols, dtype=None):
+    # stack blocks of rows into a single CSR matrix without intermediate copies. Each block is a
+    # list of matrices (with the same rows) which are summed, e.g., training and test items
+    counts = np.concatenate([sum(np.diff(m.indptr) for m in block) for block in blocks])
+    indptr = np.zeros(len(counts) + 1, dtype='int64')
+    np.cumsum(counts, out=indptr[1:])
+    idx_dtype = 'int32' if max(len(counts), n_cols, indptr[-1]) < np.iinfo('int32').max else 'int64'
+    indices = np.empty(indptr[-1], dtype=idx_dtype)
+    data = np.empty(indptr[-1], dtype=dtype or 'float64')
+
+    row = 0
+    for block in blocks:
+        starts = indptr[row:row + block[0].shape[0]].copy()
+        for m in block:
+            m_counts = np.diff(m.indptr)
+            pos = np.repeat(starts - m.indptr[:-1], m_counts) + np.arange(m.nnz)
+            indices[pos] = m.indices
+            data[pos] = m.data
+            starts += m_counts
+        row += block[0].shape[0]
+
+    matrix = sparse.csr_matrix((data, indices, indptr.astype(idx_dtype)),
+                               shape=(len(counts), n_cols),
+                               copy=False)
+    matrix.sum_duplicates()
+    return matrix
+
+
+def _group_offsets(keys):
+    # start position and size of each group of equal consecutive keys
+    n = len(keys)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if n else np.array([], 'int64')
+    return starts, np.diff(np.r_[starts, n])
+
+
+def _byte_ranges(path, n_ranges, start=0):
+    # split the file in (almost) equally sized ranges of whole lines
+    size = os.path.getsize(path)
+    bounds = [start]
+    with open(path, 'rb') as f:
+        for k in range(1, n_ranges):
+            f.seek(max(start + (size - start) * k // n_ranges, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _parse_range(path, start, end, sep, names):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        buffer = f.read(end - start)
+    # the multi-character separator is replaced by a single (unused) one so that the fast C
+    # parser of pandas can be used
+    buffer = buffer.replace(sep.encode(), b'\x1f')
+    return pd.read_csv(io.BytesIO(buffer), sep='\x1f', header=None, names=names, engine='c')
+
+
+def _concat_ranges(chunks):
+    # the types of the columns are inferred in each range: an id column which is not numeric
+    # in some range is made of strings in all of them, as when the whole file is parsed at once
+    chunks = list(chunks)
+    for col in chunks[0].columns.values[:2] if chunks else []:
+        if any(chunk[col].dtype == object for chunk in chunks):
+            for chunk in chunks:
+                chunk[col] = chunk[col].astype(str)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _encode(raw_ids):
+    raw_ids = np.asarray(raw_ids).astype(str)
+    return np.char.encode(raw_ids, 'utf-8') if raw_ids.size else raw_ids.astype('S1')
+
+
+def _config_fingerprint(cfg):
+    return {k: v for k, v in json.loads(json.dumps(cfg, sort_keys=True, default=str)).items()
+            if k not in _LOADING_KEYS}
+
+
+def _write_replace(path, write, mode='wb'):
+    # the file is written aside and then moved in place: the processes which are reading (or
+    # memory-mapping) the old file keep it, while the others never see a partially written file
+    tmp_path = '%s.tmp-%d-%d' % (path, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp_path, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+
+
+def _codec(compression):
+    if compression == 'zlib':
+        import zlib
+        return lambda b: zlib.compress(b, 1), zlib.decompress
+    if compression == 'lz4':
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ImportError("The 'lz4' compression requires the 'lz4' package.")
+        return lz4.frame.compress, lz4.frame.decompress
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("The 'zstd' compression requires the 'zstandard' package.")
+        # (de)compressor objects cannot be shared among threads
+        return (lambda b: zstandard.ZstdCompressor().compress(b),
+                lambda b: zstandard.ZstdDecompressor().decompress(b))
+    raise ValueError("Possible compression values are 'zlib', 'lz4' and 'zstd'.")
+
+
+def _save_csr(path, name, matrix, compression=None):
+    # int32 indices are kept as they are by scipy, so that memory-mapped arrays are not copied
+    idx_dtype = 'int32' if max(matrix.shape + (matrix.nnz,)) < np.iinfo('int32').max else 'int64'
+    header = {'format': 'csr',
+              'shape': [int(d) for d in matrix.shape],
+              'nnz': int(matrix.nnz),
+              'dtype': str(matrix.dtype)}
+    if compression:
+        compress = _codec(compression)[0]
+        header.update({'compression': compression, 'block_size': _BLOCK_SIZE, 'blocks': {}})
+
+    for arr in ['indptr', 'indices', 'data']:
+        values = getattr(matrix, arr)
+        if arr != 'data':
+            values = values.astype(idx_dtype, copy=False)
+        if not compression:
+            _write_replace(os.path.join(path, '%s.%s.npy' % (name, arr)),
+                           lambda f: np.save(f, values))
+            continue
+
+        if arr != 'data':
+            # the gaps between consecutive (sorted) indices are small and compress much better
+            values = np.concatenate([values[:1], np.diff(values)])
+        buffer = memoryview(np.ascontiguousarray(values).view(np.uint8))
+        with ThreadPoolExecutor(os.cpu_count()) as executor:
+            blocks = list(executor.map(compress, [buffer[i:i + _BLOCK_SIZE]
+                                                  for i in range(0, len(buffer), _BLOCK_SIZE)]))
+        _write_replace(os.path.join(path, '%s.%s.%s' % (name, arr, compression)),
+                       lambda f: [f.write(block) for block in blocks])
+        header['blocks'][arr] = {'dtype': str(values.dtype),
+                                 'size': int(values.size),
+                                 'lengths': [len(block) for block in blocks]}
+
+    # the header is written last, since it marks the matrix as saved
+    _write_replace(os.path.join(path, '%s.json' % name), lambda f: json.dump(header, f), 'w')
+
+
+def _load_shards(path):
+    path = os.path.join(path, _SHARDS)
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _load_csr(path, name, mmap_mode=None):
+    with open(os.path.join(path, '%s.json' % name), 'r') as f:
+        header = json.load(f)
+
+    if header.get('compression'):
+        arrays = _load_compressed(path, name, header)
+    else:
+        arrays = [np.load(os.path.join(path, '%s.%s.npy' % (name, arr)), mmap_mode=mmap_mode)
+                  for arr in ['data', 'indices', 'indptr']]
+    return sparse.csr_matrix(tuple(arrays), shape=tuple(header['shape']), copy=False)
+
+
+def _load_compressed(path, name, header):
+    # compressed splits are always decompressed in memory, block by block in parallel
+    decompress = _codec(header['compression'])[1]
+    block_size = header['block_size']
+    arrays, jobs = {}, []
+    for arr, info in header['blocks'].items():
+        arrays[arr] = np.empty(info['size'], dtype=info['dtype'])
+        buffer = arrays[arr].view(np.uint8)
+        with open(os.path.join(path, '%s.%s.%s' % (name, arr, header['compression'])), 'rb') as f:
+            for k, length in enumerate(info['lengths']):
+                jobs.append((buffer[k * block_size:(k + 1) * block_size], f.read(length)))
+
+    def fill(job):
+        job[0][:] = np.frombuffer(decompress(job[1]), dtype=np.uint8)
+
+    with ThreadPoolExecutor(os.cpu_count()) as executor:
+        list(executor.map(fill, jobs))
+    for arr in ['indptr', 'indices']:
+        np.cumsum(arrays[arr], out=arrays[arr])
+    return [arrays[arr] for arr in ['data', 'indices', 'indptr']]
+
 
 class DataProcessing:
     r"""Class that manages the pre-processing of raw data sets.
@@ -68,12 +383,25 @@ class DataProcessing:
     cfg : :class:`rectorch.configuration.DataConfig`
         The :class:`rectorch.configuration.DataConfig` object containing the pre-processing
         configurations.
+    iid_index : :class:`pandas.Index`
+        Index of the raw item ids, i.e., as in the raw `csv` file, where the position of a raw id
+        is its internal id (an integer between 0 and the total number of items -1). Raw ids are
+        mapped to internal ids with ``iid_index.get_indexer(raw_ids)``, while internal ids are
+        mapped back to raw ids with ``iid_index[inner_ids]``.
+    uid_index : :class:`pandas.Index`
+        Index of the raw user ids, i.e., as in the raw `csv` file, where the position of a raw id
+        is its internal id (an integer between 0 and the total number of users -1). It works as
+        :attr:`iid_index`.
     i2id : :obj:`dict` (key - :obj:`str`, value - :obj:`int`)
         Dictionary which maps the raw item id, i.e., as in the raw `csv` file, to an internal id
-        which is an integer between 0 and the total number of items -1.
+        which is an integer between 0 and the total number of items -1. The dictionary is built
+        from :attr:`iid_index` on the first access, and built again only when :attr:`iid_index`
+        changes. Setting it replaces :attr:`iid_index`.
     u2id : :obj:`dict` (key - :obj:`str`, value - :obj:`int`)
         Dictionary which maps the raw user id, i.e., as in the raw `csv` file, to an internal id
-        which is an integer between 0 and the total number of users -1.
+        which is an integer between 0 and the total number of users -1. The dictionary is built
+        from :attr:`uid_index` on the first access, and built again only when :attr:`uid_index`
+        changes. Setting it replaces :attr:`uid_index`.
     """
     def __init__(self, data_config):
         if isinstance(data_config, DataConfig):
@@ -83,23 +411,53 @@ class DataProcessing:
         else:
             raise TypeError("'data_config' must be of type 'DataConfig' or 'str'.")
 
-        self.i2id = {}
-        self.u2id = {}
-
-    def process(self):
+        self.iid_index = pd.Index([])
+        self.uid_index = pd.Index([])
+        # dictionaries cached along with the index they have been built from
+        self._i2id = (None, None)
+        self._u2id = (None, None)
+
+    @property
+    def i2id(self):
+        if self._i2id[0] is not self.iid_index:
+            self._i2id = (self.iid_index, {iid: i for i, iid in enumerate(self.iid_index)})
+        return self._i2id[1]
+
+    @i2id.setter
+    def i2id(self, value):
+        self.iid_index = pd.Index(sorted(value, key=value.get))
+        self._i2id = (self.iid_index, value)
+
+    @property
+    def u2id(self):
+        if self._u2id[0] is not self.uid_index:
+            self._u2id = (self.uid_index, {uid: i for i, uid in enumerate(self.uid_index)})
+        return self._u2id[1]
+
+    @u2id.setter
+    def u2id(self, value):
+        self.uid_index = pd.Index(sorted(value, key=value.get))
+        self._u2id = (self.uid_index, value)
+
+    def process(self, force=False):
         r"""Perform the entire pre-processing.
 
         The pre-processing relies on the configurations provided in the data configuration file.
         The full pre-processing follows a specific pipeline (the meaning of each configuration
         parameter is defined in :ref:`config-format`):
 
-        1. Reading the CSV file named ``data_path``;
+        1. Reading the CSV (or parquet) file named ``data_path``;
         2. Filtering the ratings on the basis of the ``threshold``;
-        3. Filtering the users and items according to ``u_min`` and ``i_min``, respectively;
+        3. Filtering the users and items according to ``u_min`` and ``i_min``, respectively. If
+           ``kcore`` is set, the filtering is repeated until every user has at least ``u_min``
+           ratings and every item has at least ``i_min`` ratings;
         4. Splitting the users in training, validation and test sets;
         5. Splitting the validation and test set user ratings in training and test items according\
-            to ``test_prop``;
-        6. Creating the id mappings (see :attr:`i2id` and :attr:`u2id`);
+            to ``test_prop``. The test items are drawn at random, unless ``split`` is\
+            ``"temporal"``: in that case the test items are the most recent ones according to the\
+            fourth (timestamp) column, i.e., the last ``leave_last`` items if set, otherwise the\
+            last ``test_prop`` fraction of the items;
+        6. Creating the id mappings (see :attr:`iid_index` and :attr:`uid_index`);
         7. Saving the pre-processed data set files in ``proc_path`` folder.
 
         .. warning:: In step (4) there is the possibility that users in the validation or test set\
@@ -126,43 +484,364 @@ class DataProcessing:
             internal id, while the string on the corresponding line is the raw id;
         * ``unique_iid.txt`` : (`txt` file) with the item id mapping. Line numbers represent the\
             internal id, while the string on the corresponding line is the raw id;
+        * ``unique_uid.npy`` and ``unique_iid.npy`` : (`npy` files) the same id mappings saved\
+            as fixed-width byte strings, see :class:`IdMap`;
+        * ``id_dtypes.json`` : (`json` file) the types of the raw user and item ids, which are\
+            restored when the id mappings are loaded from the cache;
+
+        When ``binary`` is set to 1 in the configuration, each split is also saved in binary
+        CSR format, i.e., ``<split>.indptr.npy``, ``<split>.indices.npy`` and ``<split>.data.npy``
+        along with a small `json` header ``<split>.json`` containing the shape of the matrix.
+        These files are directly loaded by :class:`DataReader` without any `csv` parsing.
+        When ``compression`` is also set, the arrays are instead saved in blocks compressed with
+        the given codec, i.e., ``<split>.indptr.<codec>`` and so on (the indices are
+        delta-encoded), and the blocks are decompressed in parallel when loaded.
+
+        When ``memory_budget`` (in MB) is set in the configuration, the raw data file is never
+        loaded entirely in memory. It is read in chunks whose size depends on the budget: the
+        users' and items' activities are counted incrementally, and then the ratings of each chunk
+        are routed to the training file or to the (on-disk) validation and test partitions.
+        The binary training matrix and its shards are then built reading ``train.csv`` in chunks.
+        The output is the same as the in-memory pre-processing.
+
+        When ``shards`` (*N*) is set in the configuration, each split is also saved in *N* binary
+        CSR shards ``<split>.shard-<k>`` (same format as above), each one containing a contiguous
+        range of users (i.e., rows) with roughly the same number of ratings. The row ranges are
+        listed in the manifest ``shards.json``, and a shard is loaded with
+        ``DataReader(cfg, shard=(k, N))``.
+
+        Along with the pre-processed files a fingerprint of the data configuration and of the raw
+        data file (size, modification time and checksum) is saved in ``fingerprint.json``. If the
+        fingerprint matches the one of a previous run, the pre-processing is skipped and the
+        existing files in ``proc_path`` are reused. The configuration keys which only affect the
+        loading of the data set, i.e., ``mmap``, ``n_jobs``, ``proxy`` and ``proxy_buckets``, are
+        not part of the fingerprint.
 
+        Parameters
+        ----------
+        force : :obj:`bool` [optional]
+            Whether to perform the pre-processing even if the saved fingerprint matches the
+            current one, by default ``False``. See also :meth:`invalidate`.
         """
+        fingerprint = self._fingerprint()
+        if not force and self._load_fingerprint() == fingerprint:
+            logger.info("Data set already pre-processed in %s.", self.cfg.proc_path)
+            self._load_id_maps()
+            return
+        self._run(fingerprint)
+
+    def process_variants(self, seeds=None, n_folds=None, force=False):
+        r"""Pre-process several variants of the splits reading and filtering the data only once.
+
+        The variants differ either in the random ``seed`` or in the ``fold``, i.e., the block of
+        users held out as test set. In the *k*-th fold the test users are the *k*-th block of
+        ``heldout`` users of the (same) random permutation of the users, so the test users of
+        the folds do not overlap as long as ``n_folds`` :math:`\times` ``heldout`` does not
+        exceed the number of users. The raw data file is read and filtered once, and then each
+        variant is split and saved, as :meth:`process` would do, in the sub-folder
+        ``seed-<seed>`` or ``fold-<k>`` of ``proc_path``, along with its data configuration file
+        ``config.json``. Variants whose fingerprint matches are not processed again.
+
+        .. note:: When ``memory_budget`` is set, each variant reads the raw data file again.
+
+        Parameters
+        ----------
+        seeds : :obj:`list` of :obj:`int` or :obj:`None` [optional]
+            The random seeds of the variants, by default :obj:`None`.
+        n_folds : :obj:`int` or :obj:`None` [optional]
+            The number of folds, by default :obj:`None`.
+        force : :obj:`bool` [optional]
+            Whether to process all the variants even if their fingerprint matches, by default
+            ``False``.
+
+        Returns
+        -------
+        :obj:`list` of :class:`rectorch.configuration.DataConfig`
+            The data configurations of the variants, which can be given to :class:`DataReader`
+            or :class:`DatasetManager`.
+
+        Raises
+        ------
+        :class:`ValueError`
+            Raised when both or none of ``seeds`` and ``n_folds`` are given.
+        """
+        if (seeds is None) == (n_folds is None):
+            raise ValueError("Exactly one between 'seeds' and 'n_folds' must be given.")
+        if seeds is not None:
+            variants = [('seed-%d' % seed, {'seed': int(seed)}) for seed in seeds]
+        else:
+            variants = [('fold-%d' % k, {'fold': k}) for k in range(n_folds)]
+
+        base = self._fingerprint()
+        procs, todo = [], []
+        for name, changes in variants:
+            cfg_d = json.loads(json.dumps(self.cfg, default=str))
+            cfg_d.update(changes, proc_path=os.path.join(self.cfg.proc_path, name))
+            os.makedirs(cfg_d['proc_path'], exist_ok=True)
+            cfg_path = os.path.join(cfg_d['proc_path'], 'config.json')
+            with open(cfg_path, 'w') as f:
+                json.dump(cfg_d, f, indent=4)
+
+            proc = DataProcessing(cfg_path)
+            procs.append(proc)
+            fingerprint = dict(base, config=_config_fingerprint(proc.cfg))
+            if force or proc._load_fingerprint() != fingerprint:
+                todo.append((proc, fingerprint))
+
+        if todo:
+            filtered = None if self.cfg.memory_budget else self._read_filtered()
+            for proc, fingerprint in todo:
+                logger.info("Processing the variant in %s.", proc.cfg.proc_path)
+                proc._run(fingerprint, filtered)
+        return [proc.cfg for proc in procs]
+
+    def _run(self, fingerprint, filtered=None):
+        self.invalidate()
+        self._remove_deltas()
+        self._remove_shards()
+        self._remove_caches()
         np.random.seed(int(self.cfg.seed))
 
-        logger.info("Reading data file %s.", self.cfg.data_path)
+        if filtered is not None:
+            self._process_filtered(*filtered)
+        elif self.cfg.memory_budget:
+            self._process_chunks()
+        else:
+            self._process_memory()
 
-        sep = self.cfg.separator if self.cfg.separator else ','
-        raw_data = pd.read_csv(self.cfg.data_path, sep=sep, header=self.cfg.header)
+        if self.cfg.shards:
+            self._save_shards(int(self.cfg.shards))
 
-        if self.cfg.threshold:
-            raw_data = raw_data[raw_data[raw_data.columns.values[2]] > float(self.cfg.threshold)]
+        with open(os.path.join(self.cfg.proc_path, _FINGERPRINT), 'w') as f:
+            json.dump(fingerprint, f)
+        logger.info("Preprocessing complete!")
+
+    def _process_memory(self):
+        self._process_filtered(*self._read_filtered())
+
+    def _read_filtered(self):
+        logger.info("Reading data file %s.", self.cfg.data_path)
+        raw_data = self._apply_threshold(self._read_raw())
 
         logger.info("Applying filtering.")
         imin, umin = int(self.cfg.i_min), int(self.cfg.u_min)
         raw_data, user_activity, _ = self._filter(raw_data, umin, imin)
         print(raw_data.head())
+        return raw_data, user_activity
+
+    def _process_filtered(self, raw_data, user_activity):
+        unique_uid, tr_users, vd_users, te_users = self._split_users(user_activity.index)
+
+        [uhead, ihead] = raw_data.columns.values[:2]
+        train_data = raw_data.loc[raw_data[uhead].isin(tr_users)]
+        self.uid_index = unique_uid
+        self.iid_index = pd.Index(pd.unique(train_data[ihead]))
+
+        val_data = raw_data.loc[raw_data[uhead].isin(vd_users)]
+        test_data = raw_data.loc[raw_data[uhead].isin(te_users)]
+        heldout = self._split_heldout(val_data, test_data, len(tr_users))
+        self._save_id_maps()
+
+        logger.info("Saving all the files.")
+        train_data = self._numerize(train_data)
+        train_data.to_csv(os.path.join(self.cfg.proc_path, 'train.csv'), index=False)
+        if self.cfg.binary:
+            _save_csr(self.cfg.proc_path,
+                      'train',
+                      _train_csr(train_data, len(self.iid_index), self.cfg.topn, self.cfg.dtype),
+                      self.cfg.compression)
+        self._save_heldout(heldout)
+
+    def _process_chunks(self):
+        chunksize = self._chunk_size()
+        logger.info("Reading data file %s in chunks of %d ratings.", self.cfg.data_path, chunksize)
+
+        logger.info("Applying filtering.")
+        imin, umin = int(self.cfg.i_min), int(self.cfg.u_min)
+        items = None
+        if self.cfg.kcore:
+            users = None
+            while True:
+                ucnt, icnt = self._count_chunks(chunksize, users, items)
+                n_active = len(ucnt), len(icnt)
+                ucnt, icnt = ucnt[ucnt >= umin], icnt[icnt >= imin]
+                users, items = ucnt.index, icnt.index
+                if (len(ucnt), len(icnt)) == n_active:
+                    break
+        else:
+            if imin > 0:
+                _, icnt = self._count_chunks(chunksize)
+                items = icnt.index[icnt >= imin]
+            ucnt, _ = self._count_chunks(chunksize, items=items)
+            if umin > 0:
+                ucnt = ucnt[ucnt >= umin]
+
+        unique_uid, tr_users, vd_users, _ = self._split_users(ucnt.sort_index().index)
+        n_train, n_val = len(tr_users), len(vd_users)
+        self.uid_index = unique_uid
+        self.iid_index = pd.Index([])
+
+        logger.info("Routing the ratings to the splits.")
+        if not os.path.exists(self.cfg.proc_path):
+            os.makedirs(self.cfg.proc_path)
+        train_path = os.path.join(self.cfg.proc_path, 'train.csv')
+        val_parts, test_parts = [], []
+        with tempfile.TemporaryDirectory() as spool_dir:
+            for k, chunk in enumerate(self._iter_raw(chunksize)):
+                [uhead, ihead] = chunk.columns.values[:2]
+                if items is not None:
+                    chunk = chunk[items.get_indexer(chunk[ihead]) >= 0]
+                pos = unique_uid.get_indexer(chunk[uhead])
+
+                train_data = chunk[(pos >= 0) & (pos < n_train)]
+                new_iid = pd.Index(pd.unique(train_data[ihead]))
+                new_iid = new_iid[self.iid_index.get_indexer(new_iid) < 0]
+                self.iid_index = self.iid_index.append(new_iid) if len(self.iid_index) else new_iid
+
+                train_data = self._numerize(train_data)
+                train_data.to_csv(train_path, mode='a' if k else 'w', header=not k, index=False)
+
+                val_mask = (pos >= n_train) & (pos < n_train + n_val)
+                for name, parts, mask in [('val', val_parts, val_mask),
+                                          ('test', test_parts, pos >= n_train + n_val)]:
+                    parts.append(os.path.join(spool_dir, '%s-%d.pkl' % (name, k)))
+                    chunk[mask].to_pickle(parts[-1])
+
+            val_data = pd.concat([pd.read_pickle(path) for path in val_parts])
+            test_data = pd.concat([pd.read_pickle(path) for path in test_parts])
+
+        heldout = self._split_heldout(val_data, test_data, n_train)
+        self._save_id_maps()
 
-        unique_uid = user_activity.index
+        logger.info("Saving all the files.")
+        if self.cfg.binary:
+            # the training matrix is built from train.csv without loading the whole file
+            counts = _csv_row_counts([train_path], chunksize)
+            _save_csr(self.cfg.proc_path,
+                      'train',
+                      _csv_csr([train_path], counts, len(self.iid_index), self.cfg.topn,
+                               self.cfg.dtype, chunksize),
+                      self.cfg.compression)
+        self._save_heldout(heldout)
+
+    def _read_raw(self, data_path=None, nrows=None):
+        data_path = data_path or self.cfg.data_path
+        if self._is_columnar(data_path):
+            chunks = []
+            for chunk in self._iter_columnar(data_path):
+                chunks.append(chunk)
+                if nrows is not None and sum(len(c) for c in chunks) >= nrows:
+                    break
+            return pd.concat(chunks, ignore_index=True).iloc[:nrows]
+
+        sep = self.cfg.separator if self.cfg.separator else ','
+        if nrows is None and self._is_multichar(sep):
+            start, names = self._multichar_header(data_path, sep)
+            n_jobs = int(self.cfg.n_jobs) if self.cfg.n_jobs else os.cpu_count()
+            ranges = _byte_ranges(data_path, n_jobs, start)
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                chunks = pool.map(_parse_range,
+                                  *zip(*[(data_path, a, b, sep, names) for a, b in ranges]))
+                return _concat_ranges(chunks)
+        return pd.read_csv(data_path, sep=sep, header=self.cfg.header, nrows=nrows)
+
+    def _iter_raw(self, chunksize):
+        sep = self.cfg.separator if self.cfg.separator else ','
+        if self._is_columnar(self.cfg.data_path):
+            for batch in self._iter_columnar(self.cfg.data_path):
+                for start in range(0, len(batch), chunksize):
+                    yield self._apply_threshold(batch.iloc[start:start + chunksize])
+        elif self._is_multichar(sep):
+            path = self.cfg.data_path
+            start, names = self._multichar_header(path, sep)
+            with open(path, 'rb') as f:
+                f.seek(start)
+                sizes = [len(line) for line, _ in zip(f, range(1000))]
+            line_size = max(np.mean(sizes), 1) if sizes else 1
+            n_ranges = int(np.ceil((os.path.getsize(path) - start) / (chunksize * line_size)))
+            for a, b in _byte_ranges(path, max(n_ranges, 1), start):
+                yield self._apply_threshold(_parse_range(path, a, b, sep, names))
+        else:
+            for chunk in pd.read_csv(self.cfg.data_path,
+                                     sep=sep,
+                                     header=self.cfg.header,
+                                     chunksize=chunksize):
+                yield self._apply_threshold(chunk)
+
+    def _is_multichar(self, sep):
+        # plain (non regex) multi-character separators are handled by the parallel parser
+        return len(sep) > 1 and not any(c in sep for c in '.^$*+?{}[]\\|()')
+
+    def _multichar_header(self, data_path, sep):
+        if self.cfg.header is None:
+            return 0, None
+        with open(data_path, 'rb') as f:
+            for _ in range(int(self.cfg.header)):
+                f.readline()
+            names = f.readline().decode().rstrip('\r\n').split(sep)
+            return f.tell(), names
+
+    def _is_columnar(self, data_path):
+        if self.cfg.data_format:
+            return self.cfg.data_format == 'parquet'
+        return data_path.endswith(('.parquet', '.pq'))
+
+    def _iter_columnar(self, data_path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading parquet files requires the 'pyarrow' package.")
+
+        pfile = pq.ParquetFile(data_path)
+        columns = list(self.cfg.columns) if self.cfg.columns else None
+        for i in range(pfile.num_row_groups):
+            batch = pfile.read_row_group(i, columns=columns).to_pandas()
+            yield batch[columns] if columns else batch
+
+    def _apply_threshold(self, data):
+        if self.cfg.threshold:
+            data = data[data[data.columns.values[2]] > float(self.cfg.threshold)]
+        return data
+
+    def _chunk_size(self):
+        sample = self._read_raw(nrows=1000)
+        row_size = sample.memory_usage(index=True, deep=True).sum() / max(len(sample), 1)
+        # each chunk is copied a few times while it is filtered and routed
+        return max(int(float(self.cfg.memory_budget) * 2**20 / (4 * row_size)), 1)
+
+    def _count_chunks(self, chunksize, users=None, items=None):
+        ucnt, icnt = pd.Series([], dtype='int64'), pd.Series([], dtype='int64')
+        for chunk in self._iter_raw(chunksize):
+            [uhead, ihead] = chunk.columns.values[:2]
+            if users is not None:
+                chunk = chunk[users.get_indexer(chunk[uhead]) >= 0]
+            if items is not None:
+                chunk = chunk[items.get_indexer(chunk[ihead]) >= 0]
+            ucnt = ucnt.add(chunk[uhead].value_counts(), fill_value=0)
+            icnt = icnt.add(chunk[ihead].value_counts(), fill_value=0)
+        return ucnt.astype('int64'), icnt.astype('int64')
+
+    def _split_users(self, unique_uid):
         idx_perm = np.random.permutation(unique_uid.size)
         unique_uid = unique_uid[idx_perm]
         n_users = unique_uid.size
         n_heldout = self.cfg.heldout
+        if self.cfg.fold:
+            # the fold-th block of heldout users (from the end) becomes the test set
+            unique_uid = unique_uid[np.roll(np.arange(n_users), int(self.cfg.fold) * n_heldout)]
 
         logger.info("Calculating splits.")
         tr_users = unique_uid[:(n_users - n_heldout * 2)]
         vd_users = unique_uid[(n_users - n_heldout * 2): (n_users - n_heldout)]
         te_users = unique_uid[(n_users - n_heldout):]
+        return unique_uid, tr_users, vd_users, te_users
 
-        [uhead, ihead] = raw_data.columns.values[:2]
-        train_data = raw_data.loc[raw_data[uhead].isin(tr_users)]
-        unique_iid = pd.unique(train_data[ihead])
+    def _split_heldout(self, val_data, test_data, n_train):
+        [uhead, ihead] = val_data.columns.values[:2]
 
         logger.info("Creating validation and test set.")
-        val_data = raw_data.loc[raw_data[uhead].isin(vd_users)]
-        val_data = val_data.loc[val_data[ihead].isin(unique_iid)]
-        test_data = raw_data.loc[raw_data[uhead].isin(te_users)]
-        test_data = test_data.loc[test_data[ihead].isin(unique_iid)]
+        val_data = val_data.loc[val_data[ihead].isin(self.iid_index)]
+        test_data = test_data.loc[test_data[ihead].isin(self.iid_index)]
 
         vcnt = val_data[[uhead]].groupby(uhead, as_index=False).size()
         tcnt = test_data[[uhead]].groupby(uhead, as_index=False).size()
@@ -179,51 +858,258 @@ class DataProcessing:
         val_data_tr, val_data_te = self._split_train_test(val_data)
         test_data_tr, test_data_te = self._split_train_test(test_data)
 
-        val_us = list(val_data.groupby(uhead).count().index)
-        te_us = list(test_data.groupby(uhead).count().index)
-        us = val_us + te_us
-
-        unique_uid = list(unique_uid)
-        todel = [u for u in unique_uid[len(tr_users):] if u not in us]
-        for u in todel:
-            unique_uid.remove(u)
-
-        self.i2id = dict((iid, i) for (i, iid) in enumerate(unique_iid))
-        self.u2id = dict((uid, i) for (i, uid) in enumerate(unique_uid))
+        us = np.concatenate([pd.unique(val_data[uhead]), pd.unique(test_data[uhead])])
+        keep = np.arange(len(self.uid_index)) < n_train
+        self.uid_index = self.uid_index[keep | self.uid_index.isin(us)]
+        return val_data_tr, val_data_te, test_data_tr, test_data_te
 
+    def _save_id_maps(self):
         logger.info("Saving unique_iid.txt.")
         pro_dir = self.cfg.proc_path
         if not os.path.exists(pro_dir):
             os.makedirs(pro_dir)
 
         with open(os.path.join(pro_dir, 'unique_iid.txt'), 'w') as f:
-            for iid in unique_iid:
+            for iid in self.iid_index:
                 f.write('%s\n' % iid)
 
         logger.info("Saving unique_uid.txt.")
         with open(os.path.join(pro_dir, 'unique_uid.txt'), 'w') as f:
-            for uid in unique_uid:
+            for uid in self.uid_index:
                 f.write('%s\n' % uid)
 
-        train_data = self._numerize(train_data, self.u2id, self.i2id)
-        val_data_tr = self._numerize(val_data_tr, self.u2id, self.i2id)
-        val_data_te = self._numerize(val_data_te, self.u2id, self.i2id)
-        test_data_tr = self._numerize(test_data_tr, self.u2id, self.i2id)
-        test_data_te = self._numerize(test_data_te, self.u2id, self.i2id)
+        self._save_id_arrays()
+
+    def _save_id_arrays(self):
+        IdMap.from_index(self.iid_index).save(self.cfg.proc_path, 'unique_iid')
+        IdMap.from_index(self.uid_index).save(self.cfg.proc_path, 'unique_uid')
+        # the raw ids are saved as strings, their type is restored when the maps are loaded
+        with open(os.path.join(self.cfg.proc_path, _ID_DTYPES), 'w') as f:
+            json.dump({'iid': str(self.iid_index.dtype), 'uid': str(self.uid_index.dtype)}, f)
+
+    def _save_heldout(self, heldout):
+        heldout = [self._numerize(data) for data in heldout]
+        for name, data in zip(_SPLITS[1:], heldout):
+            data.to_csv(os.path.join(self.cfg.proc_path, name + '.csv'), index=False)
+
+        if self.cfg.binary:
+            logger.info("Saving the binary CSR splits.")
+            n_items, topn, dtype = len(self.iid_index), self.cfg.topn, self.cfg.dtype
+            matrices = list(_train_test_csr(heldout[0], heldout[1], n_items, topn, dtype))
+            matrices += list(_train_test_csr(heldout[2], heldout[3], n_items, topn, dtype))
+            for name, matrix in zip(_SPLITS[1:], matrices):
+                _save_csr(self.cfg.proc_path, name, matrix, self.cfg.compression)
+
+    def append(self, data_path):
+        r"""Append new ratings to an already pre-processed data set.
+
+        The new ratings are read from ``data_path``, which must have the same format of the raw
+        data file (see :ref:`csv-format`), and filtered according to ``threshold``. Users and
+        items are mapped to the existing internal ids (see ``unique_uid.txt`` and
+        ``unique_iid.txt``), and new users and items are given new ids following the existing
+        ones. The ratings are saved in a new training segment ``train.delta-<n>.csv``, listed in
+        ``deltas.json``, that :class:`DataReader` merges with the training set when loading it.
+        Thus, the cost of an update only depends on the number of new ratings.
+
+        .. warning:: The validation and test sets are kept fixed, so the new ratings of the\
+           validation and test users are discarded. Moreover, the ``u_min`` and ``i_min``\
+           filters are not applied to the new ratings.
+
+        .. note:: New training users are placed after the existing training users in the\
+           training matrix loaded by :class:`DataReader`, so their row is not their internal id\
+           (see :attr:`DataReader.train_uids`).
 
-        logger.info("Saving all the files.")
-        train_data.to_csv(os.path.join(pro_dir, 'train.csv'), index=False)
-        val_data_tr.to_csv(os.path.join(pro_dir, 'validation_tr.csv'), index=False)
-        val_data_te.to_csv(os.path.join(pro_dir, 'validation_te.csv'), index=False)
-        test_data_tr.to_csv(os.path.join(pro_dir, 'test_tr.csv'), index=False)
-        test_data_te.to_csv(os.path.join(pro_dir, 'test_te.csv'), index=False)
-        logger.info("Preprocessing complete!")
+        Parameters
+        ----------
+        data_path : :obj:`str`
+            Path to the file with the new ratings.
+        """
+        self._load_id_maps()
+        manifest = self._load_deltas()
+
+        logger.info("Reading data file %s.", data_path)
+        new_data = self._apply_threshold(self._read_raw(data_path))
+        [uhead, ihead] = new_data.columns.values[:2]
+        # the ids are converted to the type of the existing raw ids
+        new_data[uhead] = new_data[uhead].astype(str).astype(self.uid_index.dtype)
+        new_data[ihead] = new_data[ihead].astype(str).astype(self.iid_index.dtype)
+
+        pos = self.uid_index.get_indexer(new_data[uhead])
+        n_train, n_heldout = manifest['train_users'], manifest['heldout_users']
+        heldout = (pos >= n_train) & (pos < n_train + n_heldout)
+        if np.any(heldout):
+            logger.warning("Skipped %d ratings of validation and test users.", np.sum(heldout))
+        new_data, pos = new_data[~heldout], pos[~heldout]
+
+        new_uid = pd.Index(pd.unique(new_data[uhead].values[pos < 0]))
+        new_iid = pd.Index(pd.unique(new_data[ihead]))
+        new_iid = new_iid[self.iid_index.get_indexer(new_iid) < 0]
+        self.uid_index = self.uid_index.append(new_uid)
+        self.iid_index = self.iid_index.append(new_iid)
+        logger.info("Added %d users and %d items.", len(new_uid), len(new_iid))
+
+        with open(os.path.join(self.cfg.proc_path, 'unique_iid.txt'), 'a') as f:
+            for iid in new_iid:
+                f.write('%s\n' % iid)
+        with open(os.path.join(self.cfg.proc_path, 'unique_uid.txt'), 'a') as f:
+            for uid in new_uid:
+                f.write('%s\n' % uid)
+        # fixed-width arrays can not be appended to, thus they are rewritten
+        self._save_id_arrays()
+
+        name = 'train.delta-%d.csv' % (len(manifest['segments']) + 1)
+        self._numerize(new_data).to_csv(os.path.join(self.cfg.proc_path, name), index=False)
+        manifest['segments'].append(name)
+        with open(os.path.join(self.cfg.proc_path, _DELTAS), 'w') as f:
+            json.dump(manifest, f)
+        logger.info("Saved %d new training ratings in %s.", len(new_data), name)
+
+        shards = _load_shards(self.cfg.proc_path)
+        if shards is not None:
+            self._save_shards(shards['num_shards'], ['train'])
+        self._remove_caches()
+
+    def _load_deltas(self):
+        path = os.path.join(self.cfg.proc_path, _DELTAS)
+        if os.path.isfile(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+
+        heldout_uids = [pd.read_csv(os.path.join(self.cfg.proc_path, name + '.csv'),
+                                    usecols=['uid'])['uid'] for name in _SPLITS[1:]]
+        heldout_uids = pd.concat(heldout_uids)
+        n_train = int(heldout_uids.min()) if len(heldout_uids) else len(self.uid_index)
+        return {'train_users': n_train,
+                'heldout_users': len(self.uid_index) - n_train,
+                'segments': []}
+
+    def _remove_deltas(self):
+        path = os.path.join(self.cfg.proc_path, _DELTAS)
+        if os.path.isfile(path):
+            with open(path, 'r') as f:
+                for name in json.load(f)['segments']:
+                    os.remove(os.path.join(self.cfg.proc_path, name))
+            os.remove(path)
+
+    def _save_shards(self, num_shards, datatypes=('train', 'validation', 'test')):
+        logger.info("Saving %d shards.", num_shards)
+        manifest = _load_shards(self.cfg.proc_path) or {'num_shards': num_shards, 'rows': {}}
+        reader = DataReader(self.cfg)
+        for datatype in datatypes:
+            if datatype == 'train' and self.cfg.memory_budget:
+                self._save_train_shards(num_shards, manifest)
+                continue
+
+            # the shards always cover the whole split, even when a proxy is configured
+            matrices = reader._load_split(datatype)
+            if datatype == 'train':
+                names = ['train']
+            else:
+                names = [datatype + '_tr', datatype + '_te']
+            bounds = _shard_bounds(sum(m.indptr for m in matrices), num_shards)
+            for name, matrix in zip(names, matrices):
+                for k in range(num_shards):
+                    _save_csr(self.cfg.proc_path, '%s.shard-%d' % (name, k),
+                              matrix[bounds[k]:bounds[k + 1]], self.cfg.compression)
+            manifest['rows'][datatype] = bounds
+
+        with open(os.path.join(self.cfg.proc_path, _SHARDS), 'w') as f:
+            json.dump(manifest, f)
+
+    def _save_train_shards(self, num_shards, manifest):
+        # each shard is built from the csv files separately, thus the whole training matrix is
+        # never loaded in memory
+        chunksize = self._chunk_size()
+        paths = [os.path.join(self.cfg.proc_path, 'train.csv')]
+        deltas = None
+        if os.path.isfile(os.path.join(self.cfg.proc_path, _DELTAS)):
+            deltas = self._load_deltas()
+            paths += [os.path.join(self.cfg.proc_path, name) for name in deltas['segments']]
+
+        counts = _csv_row_counts(paths, chunksize, deltas)
+        bounds = _shard_bounds(np.r_[0, np.cumsum(counts)], num_shards)
+        for k in range(num_shards):
+            shard = _csv_csr(paths, counts[bounds[k]:bounds[k + 1]], len(self.iid_index),
+                             self.cfg.topn, self.cfg.dtype, chunksize, bounds[k], deltas)
+            _save_csr(self.cfg.proc_path, 'train.shard-%d' % k, shard, self.cfg.compression)
+        manifest['rows']['train'] = bounds
+
+    def _remove_shards(self):
+        manifest = _load_shards(self.cfg.proc_path)
+        if manifest is None:
+            return
+        for name in _SPLITS:
+            for k in range(manifest['num_shards']):
+                for ext in ['json'] + ['%s.%s' % (arr, fmt)
+                                       for arr in ['indptr', 'indices', 'data']
+                                       for fmt in ['npy', 'zlib', 'lz4', 'zstd']]:
+                    path = os.path.join(self.cfg.proc_path, '%s.shard-%d.%s' % (name, k, ext))
+                    if os.path.isfile(path):
+                        os.remove(path)
+        os.remove(os.path.join(self.cfg.proc_path, _SHARDS))
+
+    def _remove_caches(self):
+        # profiles and item-major matrices built by DataReader
+        if not os.path.isdir(self.cfg.proc_path):
+            return
+        for name in os.listdir(self.cfg.proc_path):
+            if (name.startswith('profile') and name.endswith('.json')) or '.csc.' in name:
+                os.remove(os.path.join(self.cfg.proc_path, name))
+
+    def invalidate(self):
+        r"""Invalidate the cached pre-processing.
+
+        Remove the fingerprint saved in ``proc_path`` so that the next call to :meth:`process`
+        performs the full pre-processing even if neither the configuration nor the raw data file
+        have changed.
+        """
+        path = os.path.join(self.cfg.proc_path, _FINGERPRINT)
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def _fingerprint(self):
+        md5 = hashlib.md5()
+        with open(self.cfg.data_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                md5.update(block)
+
+        stat = os.stat(self.cfg.data_path)
+        return {'config': _config_fingerprint(self.cfg),
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'checksum': md5.hexdigest()}
+
+    def _load_fingerprint(self):
+        path = os.path.join(self.cfg.proc_path, _FINGERPRINT)
+        names = [n + '.csv' for n in _SPLITS] + [_FINGERPRINT]
+        names += ['unique_%s.%s' % (k, ext) for k in ['uid', 'iid'] for ext in ['txt', 'npy']]
+        if not all(os.path.isfile(os.path.join(self.cfg.proc_path, n)) for n in names):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _load_id_maps(self):
+        path = os.path.join(self.cfg.proc_path, _ID_DTYPES)
+        dtypes = {}
+        if os.path.isfile(path):
+            with open(path, 'r') as f:
+                dtypes = json.load(f)
+
+        self.iid_index = IdMap.load(self.cfg.proc_path, 'unique_iid').index
+        self.uid_index = IdMap.load(self.cfg.proc_path, 'unique_uid').index
+        if dtypes.get('iid', 'object') != 'object':
+            self.iid_index = self.iid_index.astype(dtypes['iid'])
+        if dtypes.get('uid', 'object') != 'object':
+            self.uid_index = self.uid_index.astype(dtypes['uid'])
 
     def _filter(self, data, min_u=5, min_i=0):
         def get_count(data, idx):
             return data[[idx]].groupby(idx, as_index=False).size()
 
         [uhead, ihead] = data.columns.values[:2]
+        if self.cfg.kcore:
+            return self._filter_kcore(data, min_u, min_i)
+
         if min_i > 0:
             icnt = get_count(data, ihead)
             data = data[data[ihead].isin(icnt.index[icnt >= min_i])]
@@ -235,41 +1121,89 @@ class DataProcessing:
         ucnt, icnt = get_count(data, uhead), get_count(data, ihead)
         return data, ucnt, icnt
 
-    def _numerize(self, data, u2id, i2id):
+    def _filter_kcore(self, data, min_u=5, min_i=0):
+        [uhead, ihead] = data.columns.values[:2]
+        ucodes, uniq_u = pd.factorize(data[uhead])
+        icodes, uniq_i = pd.factorize(data[ihead])
+
+        mask = np.ones(len(data), dtype='bool')
+        n_rounds = 0
+        while True:
+            n_rounds += 1
+            udeg = np.bincount(ucodes[mask], minlength=len(uniq_u))
+            ideg = np.bincount(icodes[mask], minlength=len(uniq_i))
+            keep = mask & (udeg[ucodes] >= min_u) & (ideg[icodes] >= min_i)
+            if np.array_equal(keep, mask):
+                break
+            mask = keep
+        logger.info("K-core filtering converged in %d rounds.", n_rounds)
+
+        ucnt = pd.Series(udeg, index=uniq_u)
+        icnt = pd.Series(ideg, index=uniq_i)
+        ucnt, icnt = ucnt[ucnt > 0].sort_index(), icnt[icnt > 0].sort_index()
+        ucnt.index.name, icnt.index.name = uhead, ihead
+        return data[mask], ucnt, icnt
+
+    def _numerize(self, data):
         [uhead, ihead] = data.columns.values[:2]
-        uid = data[uhead].apply(lambda x: u2id[x])
-        iid = data[ihead].apply(lambda x: i2id[x])
+        uid = self.uid_index.get_indexer(data[uhead])
+        iid = self.iid_index.get_indexer(data[ihead])
         if self.cfg.topn:
-            return pd.DataFrame(data={'uid': uid, 'iid': iid}, columns=['uid', 'iid'])
+            return pd.DataFrame(data={'uid': uid, 'iid': iid},
+                                columns=['uid', 'iid'],
+                                index=data.index)
         else:
             dic_data = {'uid': uid, 'iid': iid}
             for c in data.columns.values[2:]:
                 dic_data[c] = data[c]
             cols = ['uid', 'iid'] + list(data.columns[2:])
-            return pd.DataFrame(data=dic_data, columns=cols)
+            return pd.DataFrame(data=dic_data, columns=cols, index=data.index)
 
     def _split_train_test(self, data):
+        if self.cfg.split == 'temporal':
+            return self._split_temporal(data)
+        elif self.cfg.split not in (None, 'random'):
+            raise ValueError("Possible split values are 'random', 'temporal'.")
+
         np.random.seed(self.cfg.seed)
         test_prop = float(self.cfg.test_prop) if self.cfg.test_prop else 0.2
         uhead = data.columns.values[0]
-        data_grouped_by_user = data.groupby(uhead)
-        tr_list, te_list = [], []
-
-        for _, group in data_grouped_by_user:
-            n_items_u = len(group)
-            if n_items_u > 1:
-                idx = np.zeros(n_items_u, dtype='bool')
-                sz = max(int(test_prop * n_items_u), 1)
-                idx[np.random.choice(n_items_u, size=sz, replace=False).astype('int64')] = True
-                tr_list.append(group[np.logical_not(idx)])
-                te_list.append(group[idx])
-            else:
-                # This should never be True
-                logger.warning("Skipped user in test set: number of ratings <= 1.")
-
-        data_tr = pd.concat(tr_list)
-        data_te = pd.concat(te_list)
-        return data_tr, data_te
+        data = data.sort_values(uhead, kind='mergesort')
+        n = len(data)
+        starts, counts = _group_offsets(data[uhead].values)
+        offsets = np.repeat(starts, counts)
+
+        # random rank of each rating within the ratings of its user
+        order = np.lexsort((np.random.random(n), np.repeat(np.arange(len(starts)), counts)))
+        rank = np.empty(n, dtype='int64')
+        rank[order] = np.arange(n) - offsets
+
+        sz = np.maximum((test_prop * counts).astype('int64'), 1)
+        idx = rank >= np.repeat(counts - sz, counts)
+        keep = np.repeat(counts > 1, counts)
+        if not np.all(keep):
+            # This should never be True
+            logger.warning("Skipped %d users in test set: number of ratings <= 1.",
+                           np.sum(counts <= 1))
+
+        return data[keep & ~idx], data[keep & idx]
+
+    def _split_temporal(self, data):
+        if len(data.columns) < 4:
+            raise ValueError("The temporal split requires a timestamp (fourth) column.")
+        uhead, thead = data.columns.values[0], data.columns.values[3]
+        data = data.iloc[np.lexsort((data[thead].values, data[uhead].values))]
+        starts, counts = _group_offsets(data[uhead].values)
+        pos = np.arange(len(data)) - np.repeat(starts, counts)
+
+        if self.cfg.leave_last:
+            # at least one rating is kept in the training part
+            sz = np.minimum(int(self.cfg.leave_last), counts - 1)
+        else:
+            test_prop = float(self.cfg.test_prop) if self.cfg.test_prop else 0.2
+            sz = np.maximum((test_prop * counts).astype('int64'), 1)
+        idx = pos >= np.repeat(counts - sz, counts)
+        return data[~idx], data[idx]
 
 
 class DataReader():
@@ -279,6 +1213,23 @@ class DataReader():
     :meth:`DataProcessing.process`. To avoid malfunctioning, the same configuration file used for
     the pre-processing should be used to load the data set. Once a reader is created it is possible
     to load to the training, validation and test set using :meth:`load_data`.
+    If the data set has been saved in binary CSR format (i.e., ``binary`` = 1 in the
+    configuration) the sparse matrices are directly loaded from the binary files. Moreover,
+    if ``mmap`` = 1 the binary files are memory-mapped (read-only) rather than read: opening
+    the data set is almost instantaneous and the arrays are shared, through the page cache,
+    by all the processes that load the same data set.
+
+    If the data set has been saved in shards (i.e., ``shards`` = *N* in the configuration), the
+    reader can be restricted to one of them with ``shard=(k, N)``: :meth:`load_data` then only
+    loads the *k*-th contiguous range of users of each split.
+
+    When ``proxy`` is set in the configuration, :meth:`load_data` returns a down-sampled proxy of
+    the data set, e.g., for fast hyper-parameter tuning: only a ``proxy`` fraction of the users of
+    each split is kept. The users are sampled (reproducibly from ``seed``) within
+    ``proxy_buckets`` buckets of users with similar activity, so the activity distribution is
+    preserved, and all the items are kept, i.e., the proxy matrices have the same columns of the
+    full ones. The number of users (and ratings) of the proxy is roughly ``proxy`` times the one
+    of the full data set.
 
     Parameters
     ----------
@@ -286,6 +1237,9 @@ class DataReader():
         Represents the data pre-processing configurations.
         When ``type(data_config) == str`` is expected to be the path to the data configuration file.
         In that case a :class:`DataConfig` object is contextually created.
+    shard : :obj:`tuple` of :obj:`int` or :obj:`None` [optional]
+        The pair (shard index, number of shards) of the shard to load, by default :obj:`None`,
+        i.e., the whole data set is loaded.
 
     Attributes
     ----------
@@ -293,14 +1247,29 @@ class DataReader():
         Object containing the loading configurations.
     n_items : :obj:`int`
         The number of items in the data set.
+    shard : :obj:`tuple` of :obj:`int` or :obj:`None`
+        See ``shard`` parameter.
+    shard_rows : :obj:`dict` (key - :obj:`str`, value - :obj:`tuple` of :obj:`int`) or :obj:`None`
+        The range of rows (first included, last excluded) of the shard in the whole matrix of
+        each split, i.e., ``'train'``, ``'validation'`` and ``'test'``.
+    proxy_rows : :obj:`dict` (key - :obj:`str`, value - :class:`numpy.ndarray`)
+        The rows of the full matrix of each loaded split kept in the proxy data set. It is empty
+        if ``proxy`` is not set.
+    train_uids : :class:`numpy.ndarray` or :obj:`None`
+        The internal user id of each row of the last loaded training matrix, :obj:`None` if it
+        has not been loaded yet. The rows are the training users followed by the users added
+        by :meth:`DataProcessing.append`, whose internal ids come after the ones of the
+        validation and test users.
 
     Raises
     ------
     :class:`TypeError`
         Raised when ``data_config`` is neither a :obj:`str` nor a
         :class:`rectorch.configuration.DataConfig`.
+    :class:`ValueError`
+        Raised when the data set has not been saved in the requested number of shards.
     """
-    def __init__(self, data_config):
+    def __init__(self, data_config, shard=None):
         if isinstance(data_config, DataConfig):
             self.cfg = data_config
         elif isinstance(data_config, str):
@@ -308,6 +1277,19 @@ class DataReader():
         else:
             raise TypeError("'data_config' must be of type 'DataConfig' or 'str'.")
         self.n_items = self._load_n_items()
+        self.shard = shard
+        self.shard_rows = None
+        self.proxy_rows = {}
+        self.train_uids = None
+        if shard is not None:
+            index, num_shards = shard
+            manifest = _load_shards(self.cfg.proc_path)
+            if manifest is None or manifest['num_shards'] != num_shards:
+                raise ValueError("The data set has not been saved in %d shards." % num_shards)
+            if not 0 <= index < num_shards:
+                raise ValueError("The shard index must be between 0 and %d." % (num_shards - 1))
+            self.shard_rows = {datatype: tuple(rows[index:index + 2])
+                               for datatype, rows in manifest['rows'].items()}
 
     def load_data(self, datatype='train'):
         r"""Load (part of) the pre-processed data set.
@@ -320,7 +1302,8 @@ class DataReader():
         datatype : :obj:`str` in {``'train'``, ``'validation'``, ``'test'``, ``'full'``} [optional]
             String representing the type of data that has to be loaded, by default ``'train'``.
             When ``datatype`` is equal to ``'full'`` the entire data set is loaded into a sparse
-            matrix.
+            matrix, whose rows are the training, validation and test users, in this order. The
+            ratings of all the splits are read once and directly copied into the full matrix.
 
         Returns
         -------
@@ -338,107 +1321,415 @@ class DataReader():
             Raised when ``datatype`` does not match any of the valid strings.
         """
         if datatype == 'train':
-            return self._load_train_data()
-        elif datatype == 'validation':
-            return self._load_train_test_data(datatype)
-        elif datatype == 'test':
-            return self._load_train_test_data(datatype)
+            train = self._proxy('train', *self._load_split('train'))[0]
+            self.train_uids = self._train_uids(train)
+            return train
+        elif datatype in ['validation', 'test']:
+            return self._proxy(datatype, *self._load_split(datatype))
         elif datatype == 'full':
-            tr = self._load_train_data()
-            val_tr, val_te = self._load_train_test_data("validation")
-            te_tr, te_te = self._load_train_test_data("test")
-            val = val_tr + val_te
-            te = te_tr + te_te
-            return sparse.vstack([tr, val, te])
+            return self._load_full_data()
         else:
             raise ValueError("Possible datatype values are 'train', 'validation', 'test', 'full'.")
 
+    def _load_split(self, datatype):
+        # the whole split, i.e., never down-sampled to the proxy data set
+        if datatype == 'train':
+            return (self._load_train_data(),)
+        return self._load_train_test_data(datatype)
+
+    def load_data_csc(self, datatype='train'):
+        r"""Load (part of) the data set as item-major sparse matrices.
+
+        Same as :meth:`load_data` but the matrices are in CSC format, i.e., with fast access to
+        the columns (items), as needed by item-based models, e.g., for computing
+        :math:`\mathbf{X}^\top \mathbf{X}`, and per-item statistics. The CSC matrices are
+        built from the CSR ones only once: they are saved in ``proc_path`` as
+        ``<split>.csc.indptr.npy``, ``<split>.csc.indices.npy`` and ``<split>.csc.data.npy``
+        (with the `json` header ``<split>.csc.json``) and directly loaded (or memory-mapped if
+        ``mmap`` = 1) afterwards. They are removed when the data set is pre-processed again or
+        new ratings are appended. The matrices of proxy data sets (see ``proxy``) are not saved.
+
+        Parameters
+        ----------
+        datatype : :obj:`str` in {``'train'``, ``'validation'``, ``'test'``, ``'full'``} [optional]
+            String representing the type of data that has to be loaded, by default ``'train'``.
+
+        Returns
+        -------
+        :obj:`scipy.sparse.csc_matrix` or :obj:`tuple` of :obj:`scipy.sparse.csc_matrix`
+            The data set or part of it, as in :meth:`load_data`.
+
+        Raises
+        ------
+        :class:`ValueError`
+            Raised when ``datatype`` does not match any of the valid strings.
+        """
+        if datatype in ('train', 'full'):
+            names = [datatype]
+        elif datatype in ('validation', 'test'):
+            names = [datatype + '_tr', datatype + '_te']
+        else:
+            raise ValueError("Possible datatype values are 'train', 'validation', 'test', 'full'.")
+        if self.shard is not None:
+            names = ['%s.shard-%d' % (name, self.shard[0]) for name in names]
+        names = [name + '.csc' for name in names]
+
+        path = self.cfg.proc_path
+        if not self.cfg.proxy and all(os.path.isfile(os.path.join(path, name + '.json'))
+                                      for name in names):
+            # the CSC arrays of a matrix are the CSR arrays of its transpose
+            mmap_mode = 'r' if self.cfg.mmap else None
+            matrices = [_load_csr(path, name, mmap_mode).T for name in names]
+        else:
+            matrices = self.load_data(datatype)
+            matrices = [matrices] if len(names) == 1 else list(matrices)
+            matrices = [m.tocsc() for m in matrices]
+            if not self.cfg.proxy:
+                for name, matrix in zip(names, matrices):
+                    _save_csr(path, name, matrix.T, self.cfg.compression)
+
+        dtype = self.cfg.dtype or 'float64'
+        matrices = [m if m.dtype == np.dtype(dtype) else m.astype(dtype) for m in matrices]
+        return matrices[0] if len(matrices) == 1 else tuple(matrices)
+
+    def _proxy(self, datatype, *matrices):
+        if not self.cfg.proxy:
+            return matrices
+
+        activity = sum(np.diff(m.indptr) for m in matrices)
+        n_users, n_buckets = len(activity), int(self.cfg.proxy_buckets or 10)
+        # buckets of (almost) the same number of users with similar activity
+        bucket = np.empty(n_users, dtype='int64')
+        bucket[np.argsort(activity, kind='mergesort')] = np.arange(n_users) * n_buckets // n_users
+
+        rng = np.random.RandomState(int(self.cfg.seed))
+        order = np.lexsort((rng.random_sample(n_users), bucket))
+        starts, counts = _group_offsets(bucket[order])
+        sizes = np.maximum(np.round(float(self.cfg.proxy) * counts).astype('int64'), 1)
+        pos = np.arange(n_users) - np.repeat(starts, counts)
+        rows = np.sort(order[pos < np.repeat(sizes, counts)])
+
+        self.proxy_rows[datatype] = rows
+        return tuple(m[rows] for m in matrices)
+
     def _load_n_items(self):
-        unique_iid = []
+        if os.path.isfile(os.path.join(self.cfg.proc_path, 'unique_iid.npy')):
+            # only the header of the array is read
+            return len(IdMap.load(self.cfg.proc_path, 'unique_iid', 'r'))
         with open(os.path.join(self.cfg.proc_path, 'unique_iid.txt'), 'r') as f:
-            for line in f:
-                unique_iid.append(line.strip())
-        return len(unique_iid)
+            return sum(1 for _ in f)
 
-    def _load_train_data(self):
-        path = os.path.join(self.cfg.proc_path, 'train.csv')
-        data = pd.read_csv(path)
-        n_users = data['uid'].max() + 1
+    def load_id_maps(self):
+        r"""Load the users' and items' id mappings.
 
-        rows, cols = data['uid'], data['iid']
-        if self.cfg.topn:
-            values = np.ones_like(rows)
+        The mappings are memory-mapped when ``mmap`` = 1 in the configuration.
+
+        Returns
+        -------
+        :obj:`tuple` of :class:`IdMap`
+            The users' id mapping and the items' id mapping, respectively.
+        """
+        mmap_mode = 'r' if self.cfg.mmap else None
+        return (IdMap.load(self.cfg.proc_path, 'unique_uid', mmap_mode),
+                IdMap.load(self.cfg.proc_path, 'unique_iid', mmap_mode))
+
+    def load_item_conditions(self, data_path, sep=',', header=None, cond_sep=None, **kwargs):
+        r"""Load the items' side information as an item x condition sparse matrix.
+
+        The side information file must have the raw item id in its first column and the
+        condition(s) of the item (e.g., genres or categories) in its last column. An item can be
+        listed on several lines, or its conditions can be joined by ``cond_sep`` (e.g., ``'|'``
+        as in the `MovieLens <https://grouplens.org/datasets/movielens/>`_ data sets). Items are
+        mapped to the internal ids of the pre-processed data set, and the items which are not in
+        the data set are ignored. The matrix can be given to the conditioned samplers, e.g.,
+        :class:`rectorch.samplers.ConditionedDataSampler`, in place of the dictionary
+        ``iid2cids``.
+
+        Parameters
+        ----------
+        data_path : :obj:`str`
+            Path to the side information file.
+        sep : :obj:`str` [optional]
+            The column delimiter of the file, by default ``','``.
+        header : :obj:`int` or :obj:`None` [optional]
+            The row number of the header of the file, by default :obj:`None`, i.e., no header.
+        cond_sep : :obj:`str` or :obj:`None` [optional]
+            The delimiter of multiple conditions in the same field, by default :obj:`None`.
+        **kwargs
+            Further arguments of :func:`pandas.read_csv`, e.g., ``encoding``.
+
+        Returns
+        -------
+        :obj:`tuple`
+            The item x condition :class:`scipy.sparse.csr_matrix` (with *n_items* rows) and the
+            :class:`pandas.Index` of the conditions, where the position of a condition is its
+            column in the matrix.
+        """
+        engine = 'python' if len(sep) > 1 else 'c'
+        side = pd.read_csv(data_path, sep=sep, header=header, engine=engine, dtype=str, **kwargs)
+        conds = side[side.columns[-1]]
+        if cond_sep is not None:
+            conds = conds.str.split(cond_sep).explode()
+        items = side[side.columns[0]].str.strip().reindex(conds.index).values
+        keep = conds.notna().values
+        items, conds = items[keep], conds.values[keep]
+
+        if os.path.isfile(os.path.join(self.cfg.proc_path, 'unique_iid.npy')):
+            iids = IdMap.load(self.cfg.proc_path, 'unique_iid').to_inner(items)
+        else:
+            with open(os.path.join(self.cfg.proc_path, 'unique_iid.txt'), 'r') as f:
+                iids = pd.Index([line.strip() for line in f]).get_indexer(items)
+        cids, cond_index = pd.factorize(conds, sort=True)
+        known = iids >= 0
+        matrix = sparse.csr_matrix((np.ones(known.sum()), (iids[known], cids[known])),
+                                   shape=(self.n_items, len(cond_index)))
+        # repeated (item, condition) pairs are counted once
+        matrix.data[:] = 1.
+        return matrix, pd.Index(cond_index)
+
+    def profile(self, ram_budget=None, force=False):
+        r"""Profile the pre-processed data set.
+
+        The profile is computed in a single pass over the sparse matrices of the training,
+        validation and test sets, and it is cached in ``profile.json`` (``profile.shard-<k>.json``
+        for a shard, ``profile.proxy-<proxy>.json`` for a proxy data set) inside ``proc_path``, so
+        later calls do not scan the data again. The cache is removed when the data set is
+        pre-processed again or new ratings are appended.
+
+        The profile contains:
+
+        * ``users``, ``items``, ``nnz`` and ``density`` of the whole data set;
+        * ``splits``: the number of users and ratings of each split;
+        * ``user_degree`` and ``item_degree``: the mean and the quantiles of the number of ratings
+          per user and per item;
+        * ``memory``: rough estimates (in MB) of the memory needed by a dense row of a mini-batch
+          (``batch_row``, i.e., training and test part as 32-bit floats), by the dense training
+          matrix (``dense_train``), by the item-item Gram matrix (``gram``), and by the training
+          of :class:`rectorch.models.EASE` (``ease``) and :class:`rectorch.models.ADMM_Slim`
+          (``admm_slim``), both including the dense score matrix of the training users.
+
+        When ``ram_budget`` is given, the profile also contains the ``suggestions`` for that
+        budget: the largest power of two ``batch_size``, not larger than the number of training
+        users, whose dense mini-batches fit in the budget, and whether ``ease`` and
+        ``admm_slim`` fit in it.
+
+        Parameters
+        ----------
+        ram_budget : :obj:`float` or :obj:`None` [optional]
+            The available memory (in MB), by default :obj:`None`.
+        force : :obj:`bool` [optional]
+            Whether to recompute the profile even if it is cached, by default ``False``.
+
+        Returns
+        -------
+        :obj:`dict`
+            The profile of the data set.
+        """
+        name = 'profile'
+        if self.shard is not None:
+            name += '.shard-%d' % self.shard[0]
+        if self.cfg.proxy:
+            name += '.proxy-%s' % self.cfg.proxy
+        path = os.path.join(self.cfg.proc_path, name + '.json')
+        if not force and os.path.isfile(path):
+            with open(path, 'r') as f:
+                profile = json.load(f)
         else:
-            values = data[data.columns.values[2]]
+            profile = self._compute_profile()
+            _write_replace(path, lambda f: json.dump(profile, f, indent=1), 'w')
+
+        if ram_budget is not None:
+            memory = profile['memory']
+            n_rows = max(int(ram_budget // memory['batch_row']), 1) if memory['batch_row'] else 1
+            n_rows = min(n_rows, max(profile['splits']['train'][0], 1))
+            profile['suggestions'] = {
+                'batch_size': 2**int(np.log2(n_rows)),
+                'ease': memory['ease'] <= ram_budget,
+                'admm_slim': memory['admm_slim'] <= ram_budget
+            }
+        return profile
+
+    def _compute_profile(self):
+        def quantiles(degree):
+            if not len(degree):
+                return None
+            stats = dict(zip([q[0] for q in _QUANTILES],
+                             np.quantile(degree, [q[1] for q in _QUANTILES]).tolist()))
+            stats['mean'] = float(np.mean(degree))
+            return stats
+
+        user_degree, item_degree, splits = [], np.zeros(self.n_items, dtype='int64'), {}
+        for datatype in ['train', 'validation', 'test']:
+            matrices = self.load_data(datatype)
+            matrices = [matrices] if datatype == 'train' else list(matrices)
+            user_degree.append(sum(np.diff(m.indptr) for m in matrices))
+            for m in matrices:
+                item_degree += np.bincount(m.indices, minlength=self.n_items)
+            splits[datatype] = [int(matrices[0].shape[0]), int(sum(m.nnz for m in matrices))]
+
+        user_degree = np.concatenate(user_degree)
+        n_users, nnz, n_items = len(user_degree), int(user_degree.sum()), self.n_items
+        n_train = splits['train'][0]
+        mb = 1. / 2**20
+        gram = n_items**2 * 8 * mb
+        dense_train = n_train * n_items * 8 * mb
+        return {'users': n_users,
+                'items': n_items,
+                'nnz': nnz,
+                'density': nnz / (n_users * n_items) if n_users * n_items else 0.,
+                'splits': splits,
+                'user_degree': quantiles(user_degree),
+                'item_degree': quantiles(item_degree),
+                'memory': {'batch_row': 2 * n_items * 4 * mb,
+                           'dense_train': dense_train,
+                           'gram': gram,
+                           # kernel and its inverse, plus data and scores
+                           'ease': 2 * gram + 2 * dense_train,
+                           # kernel, inverse and the ADMM auxiliary matrices
+                           'admm_slim': 6 * gram + 2 * dense_train}}
+
+    def _has_binary(self, name):
+        return self.cfg.binary and os.path.isfile(os.path.join(self.cfg.proc_path, name + '.json'))
+
+    def _load_csr(self, name):
+        if self.shard is not None:
+            name = '%s.shard-%d' % (name, self.shard[0])
+        matrix = _load_csr(self.cfg.proc_path, name, 'r' if self.cfg.mmap else None)
+        if matrix.dtype != np.dtype(self.cfg.dtype or 'float64'):
+            matrix = matrix.astype(self.cfg.dtype or 'float64')
+        if matrix.shape[1] < self.n_items:
+            # items added by DataProcessing.append
+            matrix = _pad_csr(matrix, (matrix.shape[0], self.n_items))
+        return matrix
 
-        data = sparse.csr_matrix((values, (rows, cols)),
-                                 dtype='float64',
-                                 shape=(n_users, self.n_items))
+    def _load_train_data(self):
+        if self.shard is not None:
+            # the shards already include the appended ratings
+            return self._load_csr('train')
+        if self._has_binary('train'):
+            data = self._load_csr('train')
+        else:
+            path = os.path.join(self.cfg.proc_path, 'train.csv')
+            data = _train_csr(pd.read_csv(path), self.n_items, self.cfg.topn, self.cfg.dtype)
+
+        delta = self._load_train_delta()
+        if delta is not None:
+            delta = _train_csr(delta, self.n_items, self.cfg.topn, self.cfg.dtype)
+            shape = (max(data.shape[0], delta.shape[0]), self.n_items)
+            data = _pad_csr(data, shape) + _pad_csr(delta, shape)
+        return data
+
+    def _load_deltas(self):
+        path = os.path.join(self.cfg.proc_path, _DELTAS)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        return manifest if manifest['segments'] else None
+
+    def _load_train_delta(self, compact=True):
+        manifest = self._load_deltas()
+        if manifest is None:
+            return None
+        data = pd.concat([pd.read_csv(os.path.join(self.cfg.proc_path, name))
+                          for name in manifest['segments']])
+        if compact:
+            data['uid'] = _compact_uids(data['uid'].values, manifest)
         return data
 
+    def _train_rows(self, train):
+        # rows of the whole training matrix of the (possibly restricted) training matrix
+        rows = self.proxy_rows['train'] if self.cfg.proxy else np.arange(train.shape[0])
+        return rows + self.shard_rows['train'][0] if self.shard is not None else rows
+
+    def _train_uids(self, train):
+        rows = self._train_rows(train)
+        manifest = self._load_deltas()
+        if manifest is None:
+            return rows
+        return np.where(rows >= manifest['train_users'], rows + manifest['heldout_users'], rows)
+
+    def _split_new_users(self, train):
+        # in the full matrix the users added by DataProcessing.append follow the validation and
+        # test users, as their internal ids
+        manifest = self._load_deltas()
+        if manifest is None:
+            return train, train[:0]
+        head = np.searchsorted(self._train_rows(train), manifest['train_users'])
+        return train[:head], train[head:]
+
     def _load_train_test_data(self, datatype='test'):
+        if self.shard is not None or (self._has_binary(f'{datatype}_tr')
+                                      and self._has_binary(f'{datatype}_te')):
+            return self._load_csr(f'{datatype}_tr'), self._load_csr(f'{datatype}_te')
+
         tr_path = os.path.join(self.cfg.proc_path, f'{datatype}_tr.csv')
         te_path = os.path.join(self.cfg.proc_path, f'{datatype}_te.csv')
 
         data_tr = pd.read_csv(tr_path)
         data_te = pd.read_csv(te_path)
-
-        start_idx = min(data_tr['uid'].min(), data_te['uid'].min())
-        end_idx = max(data_tr['uid'].max(), data_te['uid'].max())
-
-        rows_tr, cols_tr = data_tr['uid'] - start_idx, data_tr['iid']
-        rows_te, cols_te = data_te['uid'] - start_idx, data_te['iid']
-
-        if self.cfg.topn:
-            values_tr = np.ones_like(rows_tr)
-            values_te = np.ones_like(rows_te)
-        else:
-            values_tr = data_tr[data_tr.columns.values[2]]
-            values_te = data_te[data_tr.columns.values[2]]
-
-        data_tr = sparse.csr_matrix((values_tr, (rows_tr, cols_tr)),
-                                    dtype='float64',
-                                    shape=(end_idx - start_idx + 1, self.n_items))
-        data_te = sparse.csr_matrix((values_te, (rows_te, cols_te)),
-                                    dtype='float64',
-                                    shape=(end_idx - start_idx + 1, self.n_items))
-
-        tr_idx = np.diff(data_tr.indptr) != 0
-        #te_idx = np.diff(data_te.indptr) != 0
-        #keep_idx = tr_idx * te_idx
-        return data_tr[tr_idx], data_te[tr_idx]
+        return _train_test_csr(data_tr, data_te, self.n_items, self.cfg.topn, self.cfg.dtype)
+
+    def _load_full_data(self):
+        if self.cfg.proxy or self.shard is not None or all(self._has_binary(n) for n in _SPLITS):
+            # the binary arrays are copied once into the full matrix
+            train, new_users = self._split_new_users(self._proxy('train',
+                                                                 self._load_train_data())[0])
+            blocks = [[train]]
+            blocks += [self._proxy(datatype, *self._load_train_test_data(datatype))
+                       for datatype in ['validation', 'test']]
+            return _merge_rows(blocks + [[new_users]], self.n_items, self.cfg.dtype)
+
+        frames = [pd.read_csv(os.path.join(self.cfg.proc_path, name + '.csv')) for name in _SPLITS]
+        manifest = self._load_deltas()
+        n_train = manifest['train_users'] if manifest else frames[0]['uid'].max() + 1
+        parts = [(frames[0], frames[0]['uid'].values)]
+        n_rows = n_train
+
+        for data_tr, data_te in [frames[1:3], frames[3:]]:
+            # users without training items are discarded, as in the validation and test sets
+            users = np.unique(data_tr['uid'].values)
+            for data in [data_tr, data_te]:
+                data = data[np.isin(data['uid'].values, users)]
+                parts.append((data, n_rows + np.searchsorted(users, data['uid'].values)))
+            n_rows += len(users)
+
+        delta = self._load_train_delta()
+        if delta is not None:
+            # the new users follow the validation and test users, as their internal ids
+            uids = delta['uid'].values
+            rows = np.where(uids >= n_train, uids - n_train + n_rows, uids)
+            parts.append((delta, rows))
+            n_rows = max(n_rows, rows.max() + 1 if len(rows) else 0)
+
+        nnz = sum(len(data) for data, _ in parts)
+        rows, cols = np.empty(nnz, dtype='int64'), np.empty(nnz, dtype='int64')
+        values = np.ones(nnz, dtype=self.cfg.dtype or 'float64')
+        start = 0
+        for data, data_rows in parts:
+            end = start + len(data)
+            rows[start:end], cols[start:end] = data_rows, data['iid'].values
+            if not self.cfg.topn:
+                values[start:end] = data[frames[0].columns.values[2]].values
+            start = end
+        return sparse.csr_matrix((values, (rows, cols)), shape=(n_rows, self.n_items))
 
     def _to_dict(self, data, col="timestamp"):
-        data = data.sort_values(col)
-        imin = data["uid"].min()
-        #ugly but it works
-        grouped = data.groupby(by="uid")
-        grouped = grouped.apply(lambda x: x.sort_values(col)).reset_index(drop=True)
-        grouped = grouped.groupby(by="uid")
-        return {idx - imin : list(group["iid"]) for idx, group in grouped}
+        return SequenceStore.from_frame(data, col).to_dict()
 
     def _split_train_test(self, data, col):
-        np.random.seed(self.cfg.seed)
         test_prop = float(self.cfg.test_prop) if self.cfg.test_prop else 0.2
         uhead = data.columns.values[0]
-        #ugly but it works
-        data_grouped_by_user = data.groupby(uhead)
-        data_grouped_by_user = data_grouped_by_user.apply(lambda x: x.sort_values(col))
-        data_grouped_by_user = data_grouped_by_user.reset_index(drop=True)
-        data_grouped_by_user = data_grouped_by_user.groupby(uhead)
-        tr_list, te_list = [], []
-
-        for _, group in data_grouped_by_user:
-            n_items_u = len(group)
-            idx = np.zeros(n_items_u, dtype='bool')
-            sz = max(int(test_prop * n_items_u), 1)
-            idx[-sz:] = True
-            tr_list.append(group[np.logical_not(idx)])
-            te_list.append(group[idx])
-
-        data_tr = pd.concat(tr_list)
-        data_te = pd.concat(te_list)
-        return data_tr, data_te
+        if col is not None:
+            data = data.iloc[np.lexsort((data[col].values, data[uhead].values))]
+        else:
+            data = data.sort_values(uhead, kind='mergesort')
+
+        starts, counts = _group_offsets(data[uhead].values)
+        pos = np.arange(len(data)) - np.repeat(starts, counts)
+        sz = np.maximum((test_prop * counts).astype('int64'), 1)
+        idx = pos >= np.repeat(counts - sz, counts)
+        return data[~idx], data[idx]
 
     def load_data_as_dict(self, datatype='train', col="timestamp"):
         r"""Load the data as a dictionary
@@ -463,11 +1754,51 @@ class DataReader():
             dictionaries returned. The first dictionary is the training part (i.e., for each
             user its training set of items), and the second dictionart is the test part (i.e., for
             each user its test set of items).
+
+        See Also
+        --------
+        :meth:`load_data_as_sequences`
+        """
+        data = self.load_data_as_sequences(datatype, col)
+        if isinstance(data, tuple):
+            return tuple(seqs.to_dict() for seqs in data)
+        return data.to_dict()
+
+    def load_data_as_sequences(self, datatype='train', col="timestamp"):
+        r"""Load the data as compact sequences of items.
+
+        Same as :meth:`load_data_as_dict` but each part of the data set is loaded as a
+        :class:`SequenceStore`, i.e., a flat array of items along with the offsets of the users.
+        When the data set has been pre-processed with the ``"temporal"`` split, the validation and
+        test sets are loaded as saved, i.e., without being split again on ``col``.
+
+        Parameters
+        ----------
+        datatype : :obj:`str` in {``'train'``, ``'validation'``, ``'test'``, ``'full'``} [optional]
+            String representing the type of data that has to be loaded, by default ``'train'``.
+        col : :obj:`str` of :obj:`None` [optional]
+            The name of the column on which items are ordered, by default "timestamp". If
+            :obj:`None` the items keep the order of the pre-processed files.
+
+        Returns
+        -------
+        :class:`SequenceStore` or :obj:`tuple` of :class:`SequenceStore`
+            When ``datatype`` is ``'train'`` or ``'full'`` a single sequence store is returned.
+            While, if ``datatype`` is ``'validation'`` or ``'test'`` a pair of sequence stores is
+            returned, i.e., the training and the test part of the users' sequences.
+
+        Raises
+        ------
+        :class:`ValueError`
+            Raised when ``datatype`` does not match any of the valid strings, or when the reader
+            is restricted to a shard.
         """
+        if self.shard is not None:
+            raise ValueError("Sharded data sets can only be loaded with 'load_data'.")
         if datatype == 'train':
             path = os.path.join(self.cfg.proc_path, 'train.csv')
-            data = pd.read_csv(path)
-            return self._to_dict(data, col)
+            data = pd.concat([pd.read_csv(path), self._load_train_delta()])
+            return SequenceStore.from_frame(data, col)
         elif datatype == 'validation':
             path_tr = os.path.join(self.cfg.proc_path, 'validation_tr.csv')
             path_te = os.path.join(self.cfg.proc_path, 'validation_te.csv')
@@ -475,31 +1806,373 @@ class DataReader():
             path_tr = os.path.join(self.cfg.proc_path, 'test_tr.csv')
             path_te = os.path.join(self.cfg.proc_path, 'test_te.csv')
         elif datatype == 'full':
-            data_list = [pd.read_csv(os.path.join(self.cfg.proc_path, 'train.csv')),
-                         pd.read_csv(os.path.join(self.cfg.proc_path, 'validation_tr.csv')),
-                         pd.read_csv(os.path.join(self.cfg.proc_path, 'validation_te.csv')),
-                         pd.read_csv(os.path.join(self.cfg.proc_path, 'test_tr.csv')),
-                         pd.read_csv(os.path.join(self.cfg.proc_path, 'test_te.csv'))]
-            combined = pd.concat(data_list)
-            return self._to_dict(combined, col)
+            data_list = [pd.read_csv(os.path.join(self.cfg.proc_path, name + '.csv'))
+                         for name in _SPLITS]
+            combined = pd.concat(data_list + [self._load_train_delta(compact=False)])
+            return SequenceStore.from_frame(combined, col)
         else:
             raise ValueError("Possible datatype values are 'train', 'validation', 'test', 'full'.")
 
         data_tr = pd.read_csv(path_tr)
         data_te = pd.read_csv(path_te)
 
-        combined = pd.concat([data_tr, data_te], ignore_index=True)
-        combined = combined.sort_values(col)
-        data_tr, data_te = self._split_train_test(combined, col)
+        if self.cfg.split == 'temporal':
+            # already split by DataProcessing, and saved in chronological order
+            col = col if col in data_tr.columns else None
+        else:
+            combined = pd.concat([data_tr, data_te], ignore_index=True)
+            data_tr, data_te = self._split_train_test(combined, col)
+
+        return SequenceStore.from_frame(data_tr, col), SequenceStore.from_frame(data_te, col)
+
+
+class IdMap():
+    r"""Compact mapping between raw ids and internal ids.
+
+    The raw ids are stored as an array of fixed-width (UTF-8 encoded) byte strings where the
+    position of a raw id is its internal id. The array is saved in the standard `npy` format, so
+    it can be memory-mapped and its size is read from the header of the file. The hash index used
+    to map raw ids to internal ids is built on the first lookup.
+
+    Parameters
+    ----------
+    ids : :class:`numpy.ndarray`
+        Array of byte strings (i.e., with ``dtype`` ``'S<width>'``) of the raw ids.
 
-        return self._to_dict(data_tr, col), self._to_dict(data_te, col)
+    Attributes
+    ----------
+    ids : :class:`numpy.ndarray`
+        See ``ids`` parameter.
+    """
+    def __init__(self, ids):
+        self.ids = ids
+        self._index = None
+
+    @classmethod
+    def from_index(cls, raw_ids):
+        r"""Create the mapping from the sequence of raw ids.
+
+        Parameters
+        ----------
+        raw_ids : :class:`pandas.Index` or array-like
+            The raw ids ordered by internal id. Raw ids are converted to strings.
+
+        Returns
+        -------
+        :class:`IdMap`
+            The id mapping.
+        """
+        return cls(_encode(raw_ids))
+
+    @classmethod
+    def load(cls, path, name, mmap_mode=None):
+        r"""Load the mapping saved in ``<path>/<name>.npy``.
+
+        Parameters
+        ----------
+        path : :obj:`str`
+            The folder containing the mapping.
+        name : :obj:`str`
+            The name of the mapping, e.g., ``'unique_iid'``.
+        mmap_mode : :obj:`str` or :obj:`None` [optional]
+            Memory-mapping mode (see :func:`numpy.load`), by default :obj:`None`.
+
+        Returns
+        -------
+        :class:`IdMap`
+            The id mapping.
+        """
+        file_path = os.path.join(path, '%s.npy' % name)
+        try:
+            return cls(np.load(file_path, mmap_mode=mmap_mode))
+        except ValueError:
+            # empty arrays can not be memory-mapped
+            return cls(np.load(file_path))
+
+    def save(self, path, name):
+        r"""Save the mapping in ``<path>/<name>.npy``.
+
+        Parameters
+        ----------
+        path : :obj:`str`
+            The destination folder.
+        name : :obj:`str`
+            The name of the mapping, e.g., ``'unique_iid'``.
+        """
+        # replaced rather than overwritten, since the file may be memory-mapped by readers
+        _write_replace(os.path.join(path, '%s.npy' % name), lambda f: np.save(f, self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def index(self):
+        r""":class:`pandas.Index`: Index of the raw ids (as :obj:`str`) ordered by internal id.
+        """
+        return pd.Index(np.char.decode(self.ids, 'utf-8'), dtype=object)
+
+    def to_inner(self, raw_ids):
+        r"""Map raw ids to internal ids.
+
+        Parameters
+        ----------
+        raw_ids : array-like
+            The raw ids. They are compared as strings, so for instance ``12`` and ``'12'`` are
+            the same id.
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            The internal ids. Unknown raw ids are mapped to -1.
+        """
+        if self._index is None:
+            self._index = pd.Index(self.ids, dtype=object)
+        return self._index.get_indexer(_encode(raw_ids))
+
+    def to_raw(self, inner_ids):
+        r"""Map internal ids to raw ids.
+
+        Parameters
+        ----------
+        inner_ids : array-like of :obj:`int`
+            The internal ids.
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            The raw ids as strings.
+        """
+        return np.char.decode(self.ids[np.asarray(inner_ids, dtype='int64')], 'utf-8')
+
+
+class SequenceStore():
+    r"""Compact storage of the (ordered) sequences of items rated by the users.
+
+    The sequences of all users are stored in a single flat array of items, and the sequence of
+    the user *u* is the slice ``items[offsets[u]:offsets[u+1]]``. A :class:`SequenceStore` can
+    be used in place of a dictionary of lists (see :meth:`DataReader.load_data_as_dict`), e.g.,
+    by :class:`rectorch.samplers.SVAE_Sampler`, since it supports :func:`len` and indexing by
+    user.
+
+    Parameters
+    ----------
+    items : :class:`numpy.ndarray`
+        The flat array of items' ids.
+    offsets : :class:`numpy.ndarray`
+        Array of size *n* + 1, where *n* is the number of users, with the start position of each
+        sequence in ``items``. The last element is the total number of items, i.e., ``len(items)``.
+
+    Attributes
+    ----------
+    items : :class:`numpy.ndarray`
+        See ``items`` parameter.
+    offsets : :class:`numpy.ndarray`
+        See ``offsets`` parameter.
+    """
+    def __init__(self, items, offsets):
+        self.items = items
+        self.offsets = offsets
+
+    @classmethod
+    def from_frame(cls, data, col="timestamp"):
+        r"""Create the sequences from a pre-processed data frame.
+
+        The users are referred to with their ids shifted so that the smallest id is 0.
+
+        Parameters
+        ----------
+        data : :class:`pandas.DataFrame`
+            The pre-processed ratings with (at least) the columns ``uid`` and ``iid``.
+        col : :obj:`str` of :obj:`None` [optional]
+            The name of the column on which items are ordered, by default "timestamp". If
+            :obj:`None` the items keep the order of ``data``.
+
+        Returns
+        -------
+        :class:`SequenceStore`
+            The sequences of items of the users in ``data``.
+        """
+        uids = data["uid"].values
+        uids = uids - uids.min() if len(uids) else uids
+        if col is not None:
+            order = np.lexsort((data[col].values, uids))
+        else:
+            order = np.argsort(uids, kind='mergesort')
+
+        items = data["iid"].values[order].astype('int32')
+        offsets = np.zeros(uids.max() + 2 if len(uids) else 1, dtype='int64')
+        np.cumsum(np.bincount(uids), out=offsets[1:])
+        return cls(items, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, user):
+        return self.items[self.offsets[user]:self.offsets[user + 1]]
+
+    def to_dict(self):
+        r"""Convert the sequences into a dictionary of lists.
+
+        Returns
+        -------
+        :obj:`dict` (key - :obj:`int`, value - :obj:`list` of :obj:`int`)
+            Dictionary with users as keys and the lists of items as values. Users with an empty
+            sequence are not included.
+        """
+        lens = np.diff(self.offsets)
+        return {int(u) : self[u].tolist() for u in np.flatnonzero(lens)}
+
+
+class StackedCSR():
+    r"""Row-wise stack of sparse matrices which does not copy them.
+
+    The stack behaves like the matrix that :func:`scipy.sparse.vstack` would create, but
+    the blocks are kept as they are. Rows can be gathered (which only copies the selected rows),
+    and the products needed by the linear models, e.g., :math:`\mathbf{X}^\top \mathbf{X}`, are
+    computed block by block. A copy of the whole matrix is only made by :meth:`tocsr` and
+    :meth:`toarray`.
+
+    Parameters
+    ----------
+    blocks : :obj:`list` of :class:`scipy.sparse.csr_matrix`
+        The matrices to stack. They must have the same number of columns.
+
+    Attributes
+    ----------
+    blocks : :obj:`list` of :class:`scipy.sparse.csr_matrix`
+        See ``blocks`` parameter.
+    offsets : :class:`numpy.ndarray`
+        The index of the first row of each block, followed by the total number of rows.
+    shape : :obj:`tuple` of :obj:`int`
+        The shape of the stacked matrix.
+
+    Raises
+    ------
+    :class:`ValueError`
+        Raised when the blocks have a different number of columns.
+    """
+    def __init__(self, blocks):
+        self.blocks = [sparse.csr_matrix(b) if not sparse.isspmatrix_csr(b) else b for b in blocks]
+        if len({b.shape[1] for b in self.blocks}) != 1:
+            raise ValueError("The blocks must have the same number of columns.")
+        self.offsets = np.cumsum([0] + [b.shape[0] for b in self.blocks])
+        self.shape = (int(self.offsets[-1]), self.blocks[0].shape[1])
+
+    @property
+    def nnz(self):
+        return sum(b.nnz for b in self.blocks)
+
+    @property
+    def dtype(self):
+        return np.result_type(*[b.dtype for b in self.blocks])
+
+    def __getitem__(self, rows):
+        idx = np.arange(self.shape[0])[rows]
+        idx = np.atleast_1d(idx)
+        block = np.searchsorted(self.offsets, idx, side='right') - 1
+        order = np.argsort(block, kind='mergesort')
+        parts = [self.blocks[b][idx[order][block[order] == b] - self.offsets[b]]
+                 for b in np.unique(block)]
+        if not parts:
+            return sparse.csr_matrix((0, self.shape[1]), dtype=self.dtype)
+        gathered = sparse.vstack(parts, format='csr', dtype=self.dtype)
+        if np.any(np.diff(block) < 0):
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+            gathered = gathered[inverse]
+        return gathered
+
+    def nonzero(self):
+        r"""Return the indices of the non-zero elements.
+
+        Returns
+        -------
+        :obj:`tuple` of :class:`numpy.ndarray`
+            The row and the column indices of the non-zero elements (see
+            :meth:`scipy.sparse.csr_matrix.nonzero`).
+        """
+        rows, cols = zip(*[b.nonzero() for b in self.blocks])
+        rows = [r + off for r, off in zip(rows, self.offsets)]
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def sum(self, axis=None):
+        r"""Sum the elements of the matrix over the given axis.
+
+        Parameters
+        ----------
+        axis : :obj:`int` or :obj:`None` [optional]
+            The axis along which the sum is computed, by default :obj:`None`, i.e., the sum of
+            all the elements.
+
+        Returns
+        -------
+        :class:`numpy.matrix` or scalar
+            The sum, as in :meth:`scipy.sparse.csr_matrix.sum`.
+        """
+        if axis in (1, -1):
+            return np.vstack([b.sum(axis=1) for b in self.blocks])
+        return sum(b.sum(axis=axis) for b in self.blocks)
+
+    def dot(self, other):
+        r"""Multiply the matrix by ``other``.
+
+        Parameters
+        ----------
+        other : :class:`numpy.ndarray` or :class:`scipy.sparse.spmatrix`
+            The right operand.
+
+        Returns
+        -------
+        :class:`numpy.ndarray` or :class:`scipy.sparse.csr_matrix`
+            The product, which is sparse only if ``other`` is sparse.
+        """
+        results = [b.dot(other) for b in self.blocks]
+        if sparse.issparse(results[0]):
+            return sparse.vstack(results, format='csr')
+        return np.concatenate(results)
+
+    def gram(self):
+        r"""Compute the Gram matrix of the columns, i.e., :math:`\mathbf{X}^\top \mathbf{X}`.
+
+        Returns
+        -------
+        :class:`scipy.sparse.csr_matrix`
+            The (sparse) Gram matrix.
+        """
+        blocks = [b if b.dtype.kind in 'fc' else b.astype('float64') for b in self.blocks]
+        return sum(b.T.dot(b) for b in blocks).tocsr()
+
+    def tocsr(self):
+        r"""Copy the stack into a single sparse matrix.
+
+        Returns
+        -------
+        :class:`scipy.sparse.csr_matrix`
+            The stacked matrix.
+        """
+        return sparse.vstack(self.blocks, format='csr', dtype=self.dtype)
+
+    def toarray(self):
+        r"""Copy the stack into a dense array.
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            The stacked matrix.
+        """
+        array = np.zeros(self.shape, dtype=self.dtype)
+        for b, start, end in zip(self.blocks, self.offsets[:-1], self.offsets[1:]):
+            array[start:end] = b.toarray()
+        return array
 
 
 class DatasetManager():
     """Helper class for handling data sets.
 
     Given the configuration file, :class:`DatasetManager` automatically load training, validation,
-    and test sets that will be accessible from its attributes. It also gives the possibility of
+    and test sets that will be accessible from its attributes. Each set is loaded on its first
+    access and then cached, and its memory can be explicitly released with :meth:`release`.
+    It also gives the possibility of
     loading the data set into only a training and a test set. In this latter case, training,
     validation and the training part of the test set are merged together to form a bigger training
     set. The test set will be only the test part of the test set.
@@ -510,6 +2183,9 @@ class DatasetManager():
         Represents the data pre-processing configurations.
         When ``type(config_file) == str`` is expected to be the path to the data configuration file.
         In that case a :class:`DataConfig` object is contextually created.
+    shard : :obj:`tuple` of :obj:`int` or :obj:`None` [optional]
+        The pair (shard index, number of shards) of the shard to load, by default :obj:`None`.
+        See :class:`DataReader`.
 
     Attributes
     ----------
@@ -527,16 +2203,48 @@ class DatasetManager():
         training set of items), and the second matrix is the test part of the test set (i.e.,
         for each user its test set of items).
     """
-    def __init__(self, config_file):
-        reader = DataReader(config_file)
-        train_data = reader.load_data('train')
-        vad_data_tr, vad_data_te = reader.load_data('validation')
-        test_data_tr, test_data_te = reader.load_data('test')
+    def __init__(self, config_file, shard=None):
+        self._reader = DataReader(config_file, shard)
+        self._sets = {}
+        self.n_items = self._reader.n_items
+
+    def _load(self, datatype):
+        if datatype not in self._sets:
+            data = self._reader.load_data(datatype)
+            self._sets[datatype] = (data, None) if datatype == 'train' else data
+        return self._sets[datatype]
+
+    @property
+    def training_set(self):
+        return self._load('train')
+
+    @property
+    def validation_set(self):
+        return self._load('validation')
+
+    @property
+    def test_set(self):
+        return self._load('test')
+
+    def release(self, *datatypes):
+        r"""Release the memory of the loaded sets.
 
-        self.n_items = reader.n_items
-        self.training_set = (train_data, None)
-        self.validation_set = (vad_data_tr, vad_data_te)
-        self.test_set = (test_data_tr, test_data_te)
+        A released set is loaded again on its next access.
+
+        Parameters
+        ----------
+        *datatypes : :obj:`str` in {``'train'``, ``'validation'``, ``'test'``}
+            The sets to release. If none is given, all the sets are released.
+
+        Raises
+        ------
+        :class:`ValueError`
+            Raised when a datatype does not match any of the valid strings.
+        """
+        for datatype in datatypes or list(self._sets):
+            if datatype not in ('train', 'validation', 'test'):
+                raise ValueError("Possible datatype values are 'train', 'validation', 'test'.")
+            self._sets.pop(datatype, None)
 
     def get_train_and_test(self):
         r"""Return a training and a test set.
@@ -546,12 +2254,17 @@ class DatasetManager():
         The test set will be only the test part of the test set. The training part of the test users
         are the last ``t`` rows of the training matrix, where ``t`` is the number of test users.
 
+        The matrices are not copied, but they are composed in a :class:`StackedCSR` view. A copy
+        of the whole matrix is only made when explicitly required, e.g., with
+        :meth:`StackedCSR.tocsr` or :meth:`StackedCSR.toarray`.
+
         Returns
         -------
-        :obj:`tuple` of :obj:`scipy.sparse.csr_matrix`
+        :obj:`tuple` of :class:`StackedCSR`
             The first matrix is the training set, the second one is the test set.
         """
-        tr = sparse.vstack([self.training_set[0], sum(self.validation_set), self.test_set[0]])
+        tr = StackedCSR([self.training_set[0], sum(self.validation_set), self.test_set[0]])
         shape = tr.shape[0] - self.test_set[1].shape[0], tr.shape[1]
-        te = sparse.vstack([sparse.csr_matrix(shape), self.test_set[1]])
+        empty = sparse.csr_matrix(shape, dtype=self.test_set[1].dtype)
+        te = StackedCSR([empty, self.test_set[1]])
         return tr, te
@@ -56,6 +56,7 @@ import logging
 import os
 import time
 import numpy as np
+from scipy import sparse
 import torch
 import torch.nn.functional as F
 import torch.optim as optim
@@ -67,6 +68,23 @@ __all__ = ['RecSysModel', 'TorchNNTrainer', 'AETrainer', 'VAE', 'MultiVAE', 'Mul
 logger = logging.getLogger(__name__)
 
 
+def _as_float(X):
+    # the data are kept sparse (or item-major) so that X^T X does not require a dense copy
+    if sparse.issparse(X):
+        return X if X.dtype == np.float64 else X.astype(np.float64)
+    if isinstance(X, np.ndarray):
+        return X.astype(np.float64, copy=False)
+    return X
+
+
+def _gram(X):
+    if hasattr(X, 'gram'):
+        return X.gram().toarray()
+    if sparse.issparse(X):
+        return X.T.dot(X).toarray()
+    return np.dot(X.T, X)
+
+
 class RecSysModel():
     r"""Abstract base class that any Recommendation model must inherit from.
     """
@@ -1009,11 +1027,13 @@ class EASE(RecSysModel):
         Parameters
         ----------
         train_data : :class:`scipy.sparse.csr_matrix`
-            The training data.
+            The training data. It can also be a :class:`scipy.sparse.csc_matrix` (see
+            :meth:`rectorch.data.DataReader.load_data_csc`) or a
+            :class:`rectorch.data.StackedCSR`, and it is never densified.
         """
         logger.info("EASE - start tarining (lam=%.4f)", self.lam)
-        X = train_data.toarray()
-        G = np.dot(X.T, X)
+        X = _as_float(train_data)
+        G = _gram(X)
         logger.info("EASE - linear kernel computed")
         diag_idx = np.diag_indices(G.shape[0])
         G[diag_idx] += self.lam
@@ -1022,7 +1042,7 @@ class EASE(RecSysModel):
         B = P / (-np.diag(P))
         B[diag_idx] = 0
         del P
-        self.model = np.dot(X, B)
+        self.model = X.dot(B)
         logger.info("EASE - training complete")
 
     def predict(self, ids_te_users, test_tr, remove_train=True):
@@ -1478,7 +1498,10 @@ class ADMM_Slim(RecSysModel):
         Parameters
         ----------
         train_data : :class:`scipy.sparse.csr_matrix`
-            The training data.
+            The training data. It can also be a :class:`scipy.sparse.csc_matrix` (see
+            :meth:`rectorch.data.DataReader.load_data_csc`) or a
+            :class:`rectorch.data.StackedCSR`. It is densified only when :attr:`item_bias` is
+            ``True``, since the centered data are dense.
         num_iter : :obj:`int` [optional]
             Maximum number of training iterations, by default 50. This argument has no effect
             if both :attr:`nn_constr` and :attr:`l1_penalty` are set to ``False``.
@@ -1490,12 +1513,14 @@ class ADMM_Slim(RecSysModel):
         def _soft_threshold(a, k):
             return np.maximum(0., a - k) - np.maximum(0., -a - k)
 
-        X = train_data.toarray()
         if self.item_bias:
+            X = train_data.toarray() if hasattr(train_data, 'toarray') else np.asarray(train_data)
             b = X.sum(axis=0)
             X = X - np.outer(np.ones(X.shape[0]), b)
+        else:
+            X = _as_float(train_data)
 
-        XtX = X.T.dot(X)
+        XtX = _gram(X)
         logger.info("ADMM_Slim - linear kernel computed")
         diag_indices = np.diag_indices(XtX.shape[0])
         XtX[diag_indices] += self.lambda2 + self.rho
@@ -1524,7 +1549,7 @@ class ADMM_Slim(RecSysModel):
                 if not (j+1) % log_delay:
                     logger.info("| iteration %d/%d |", j+1, num_iter)
 
-        self.model = np.dot(X, C)
+        self.model = X.dot(C)
         if self.item_bias:
             self.model += b
 
@@ -8,13 +8,29 @@ Each new sampler must extend the base class :class:`Sampler` implementing all th
 methods, in particular :meth:`samplers.Sampler.__len__` and :meth:`samplers.Sampler.__iter__`.
 """
 import numpy as np
-from scipy.sparse import csr_matrix, hstack
+from scipy.sparse import csr_matrix, hstack, issparse
 import torch
 from torch.autograd import Variable
 
 __all__ = ['Sampler', 'DataSampler', 'ConditionedDataSampler', 'EmptyConditionedDataSampler',\
     'BalancedConditionedDataSampler', 'CFGAN_TrainingSampler', 'SVAE_Sampler']
 
+
+def _to_float_tensor(sparse_batch):
+    # the cast is applied on the non-zero entries only, so the batch is densified as float32
+    return torch.from_numpy(sparse_batch.astype(np.float32).toarray())
+
+
+def _condition_matrix(iid2cids, n_cond):
+    # item x condition matrix, given either as a sparse matrix or as a dictionary of lists
+    if issparse(iid2cids):
+        return csr_matrix(iid2cids, dtype=np.float64)
+    rows = [m for m in iid2cids for _ in range(len(iid2cids[m]))]
+    cols = [g for m in iid2cids for g in iid2cids[m]]
+    values = np.ones(len(rows))
+    return csr_matrix((values, (rows, cols)), shape=(len(iid2cids), n_cond))
+
+
 class Sampler():
     r"""Sampler base class.
 
@@ -97,12 +113,12 @@ class DataSampler(Sampler):
         for _, start_idx in enumerate(range(0, n, self.batch_size)):
             end_idx = min(start_idx + self.batch_size, n)
             data_tr = self.sparse_data_tr[idxlist[start_idx:end_idx]]
-            data_tr = torch.FloatTensor(data_tr.toarray())
+            data_tr = _to_float_tensor(data_tr)
 
             data_te = None
             if self.sparse_data_te is not None:
                 data_te = self.sparse_data_te[idxlist[start_idx:end_idx]]
-                data_te = torch.FloatTensor(data_te.toarray())
+                data_te = _to_float_tensor(data_te)
 
             yield data_tr, data_te
 
@@ -117,10 +133,13 @@ class ConditionedDataSampler(Sampler):
 
     Parameters
     ----------
-    iid2cids : :obj:`dict` (key :obj:`int` - value :obj:`list` of :obj:`int`)
+    iid2cids : :obj:`dict` (key :obj:`int` - value :obj:`list` of :obj:`int`) or\
+        :class:`scipy.sparse.csr_matrix`
         Dictionary that maps each item to the list of all valid conditions for that item. Items
         are referred to with the inner id, and conditions with an integer in the range 0,
-        ``n_cond`` -1.
+        ``n_cond`` -1. Alternatively, the item x condition sparse matrix whose non-zero entries
+        are the valid conditions of the items (see
+        :meth:`rectorch.data.DataReader.load_item_conditions`).
     n_cond : :obj:`int`
         Number of possible conditions.
     sparse_data_tr : :obj:`scipy.sparse.csr_matrix`
@@ -136,7 +155,8 @@ class ConditionedDataSampler(Sampler):
 
     Attributes
     ----------
-    iid2cids : :obj:`dict` (key :obj:`int` - value :obj:`list` of :obj:`int`)
+    iid2cids : :obj:`dict` (key :obj:`int` - value :obj:`list` of :obj:`int`) or\
+        :class:`scipy.sparse.csr_matrix`
         See ``iid2cids`` parameter.
     n_cond : :obj:`int`
         See ``n_cond`` parameter.
@@ -171,21 +191,18 @@ class ConditionedDataSampler(Sampler):
         self.shuffle = shuffle
         self._compute_conditions()
 
-    def _compute_conditions(self):
-        r2cond = {}
-        for i, row in enumerate(self.sparse_data_tr):
-            _, cols = row.nonzero()
-            r2cond[i] = set.union(*[set(self.iid2cids[c]) for c in cols])
-
-        self.examples = [(r, -1) for r in r2cond]
-        self.examples += [(r, c) for r in r2cond for c in r2cond[r]]
-        self.examples = np.array(self.examples)
-        del r2cond
+    def _user_conditions(self):
+        # the conditions of a user are the ones of the items in its training set
+        self.M = _condition_matrix(self.iid2cids, self.n_cond)
+        user_cond = ((self.sparse_data_tr != 0).astype(np.float64).dot(self.M) > 0).tocsr()
+        user_cond.sort_indices()
+        return user_cond
 
-        rows = [m for m in self.iid2cids for _ in range(len(self.iid2cids[m]))]
-        cols = [g for m in self.iid2cids for g in self.iid2cids[m]]
-        values = np.ones(len(rows))
-        self.M = csr_matrix((values, (rows, cols)), shape=(len(self.iid2cids), self.n_cond))
+    def _compute_conditions(self):
+        n_rows = self.sparse_data_tr.shape[0]
+        users, conds = self._user_conditions().nonzero()
+        self.examples = np.concatenate([np.c_[np.arange(n_rows), np.full(n_rows, -1)],
+                                        np.c_[users, conds]]).astype('int64')
 
     def __len__(self):
         return int(np.ceil(len(self.examples) / self.batch_size))
@@ -228,8 +245,8 @@ class ConditionedDataSampler(Sampler):
             data_te = data_te[filter_idx]
             data_tr = data_tr[filter_idx]
 
-            data_te = torch.FloatTensor(data_te.toarray())
-            data_tr = torch.FloatTensor(data_tr.toarray())
+            data_te = _to_float_tensor(data_te)
+            data_tr = _to_float_tensor(data_tr)
 
             yield data_tr, data_te
 
@@ -247,10 +264,13 @@ class BalancedConditionedDataSampler(ConditionedDataSampler):
 
     Parameters
     ----------
-    iid2cids : :obj:`dict` (key :obj:`int` - value :obj:`list` of :obj:`int`)
+    iid2cids : :obj:`dict` (key :obj:`int` - value :obj:`list` of :obj:`int`) or\
+        :class:`scipy.sparse.csr_matrix`
         Dictionary that maps each item to the list of all valid conditions for that item. Items
         are referred to with the inner id, and conditions with an integer in the range 0,
-        ``n_cond`` -1.
+        ``n_cond`` -1. Alternatively, the item x condition sparse matrix whose non-zero entries
+        are the valid conditions of the items (see
+        :meth:`rectorch.data.DataReader.load_item_conditions`).
     n_cond : :obj:`int`
         Number of possible conditions.
     sparse_data_tr : :obj:`scipy.sparse.csr_matrix`
@@ -268,7 +288,8 @@ class BalancedConditionedDataSampler(ConditionedDataSampler):
 
     Attributes
     ----------
-    iid2cids : :obj:`dict` (key :obj:`int` - value :obj:`list` of :obj:`int`)
+    iid2cids : :obj:`dict` (key :obj:`int` - value :obj:`list` of :obj:`int`) or\
+        :class:`scipy.sparse.csr_matrix`
         See ``iid2cids`` parameter.
     n_cond : :obj:`int`
         See ``n_cond`` parameter.
@@ -305,24 +326,13 @@ class BalancedConditionedDataSampler(ConditionedDataSampler):
         self._compute_sampled_conditions()
 
     def _compute_conditions(self):
-        r2cond = {}
-        for i, row in enumerate(self.sparse_data_tr):
-            _, cols = row.nonzero()
-            r2cond[i] = set.union(*[set(self.iid2cids[c]) for c in cols])
+        user_cond = self._user_conditions().tocsc()
+        user_cond.sort_indices()
 
-        self.examples = {-1 : list(r2cond.keys())}
+        self.examples = {-1 : list(range(self.sparse_data_tr.shape[0]))}
         for c in range(self.n_cond):
-            self.examples[c] = []
-            for r in r2cond:
-                if c in r2cond[r]:
-                    self.examples[c].append(r)
-        del r2cond
-        self.num_cond_examples = sum([len(self.examples[c]) for c in range(self.n_cond)])
-
-        rows = [m for m in self.iid2cids for _ in range(len(self.iid2cids[m]))]
-        cols = [g for m in self.iid2cids for g in self.iid2cids[m]]
-        values = np.ones(len(rows))
-        self.M = csr_matrix((values, (rows, cols)), shape=(len(self.iid2cids), self.n_cond))
+            self.examples[c] = user_cond.indices[user_cond.indptr[c]:user_cond.indptr[c + 1]]
+        self.num_cond_examples = user_cond.nnz
 
     def _compute_sampled_conditions(self):
         data = [(r, -1) for r in self.examples[-1]]
@@ -408,13 +418,13 @@ class EmptyConditionedDataSampler(Sampler):
             data_tr = self.sparse_data_tr[idxlist[start_idx:end_idx]]
             cond_matrix = csr_matrix((data_tr.shape[0], self.cond_size))
             data_tr = hstack([data_tr, cond_matrix], format="csr")
-            data_tr = torch.FloatTensor(data_tr.toarray())
+            data_tr = _to_float_tensor(data_tr)
 
             if self.sparse_data_te is None:
                 self.sparse_data_te = self.sparse_data_tr
 
             data_te = self.sparse_data_te[idxlist[start_idx:end_idx]]
-            data_te = torch.FloatTensor(data_te.toarray())
+            data_te = _to_float_tensor(data_te)
 
             yield data_tr, data_te
 
@@ -469,7 +479,7 @@ class CFGAN_TrainingSampler(Sampler):
     def __next__(self):
         np.random.shuffle(self.idxlist)
         data_tr = self.sparse_data_tr[self.idxlist[:self.batch_size]]
-        return torch.FloatTensor(data_tr.toarray())
+        return _to_float_tensor(data_tr)
 
 class SVAE_Sampler(Sampler):
     r"""Sampler used for training SVAE.
@@ -487,10 +497,11 @@ class SVAE_Sampler(Sampler):
     ----------
     num_items : :obj:`int`
         Number of items.
-    dict_data_tr : :obj:`dict` (key - :obj:`int`, value - :obj:`list` of :obj:`int`)
+    dict_data_tr : :obj:`dict` (key - :obj:`int`, value - :obj:`list` of :obj:`int`) or :class:`rectorch.data.SequenceStore`
         Dictionary containing the training set. Keys are the users, while the values are the lists
-        of items rated by the users in a specific (often cronological) odrer.
-    dict_data_te : :obj:`dict` (key - :obj:`int`, value - :obj:`list` of :obj:`int`) or :obj:`None` [optional]
+        of items rated by the users in a specific (often cronological) odrer. A
+        :class:`rectorch.data.SequenceStore` can be used in place of the dictionary.
+    dict_data_te : :obj:`dict` (key - :obj:`int`, value - :obj:`list` of :obj:`int`) or :class:`rectorch.data.SequenceStore` or :obj:`None` [optional]
         Dictionary containing the test part of the data set. Keys are the users, while the values
         are the lists of items rated by the users in a specific (often cronological) odrer,
         by default :obj:`None`. If :obj:`None` it is not considered in the batch creation, otherwise
@@ -542,30 +553,30 @@ class SVAE_Sampler(Sampler):
             np.random.shuffle(idxlist)
 
         for _, user in enumerate(idxlist):
-            ulen = len(self.dict_data_tr[user])
+            seq = torch.from_numpy(np.asarray(self.dict_data_tr[user], dtype=np.int64))
+            ulen = len(seq)
             y_batch_s = torch.zeros(1, ulen - 1, self.num_items)
 
             if self.is_training:
                 if self.pred_type == 'next':
-                    for timestep in range(ulen - 1):
-                        idx = self.dict_data_tr[user][timestep + 1]
-                        y_batch_s[0, timestep, idx] = 1.
+                    y_batch_s[0, torch.arange(ulen - 1), seq[1:]] = 1.
                 elif self.pred_type == 'next_k':
                     for timestep in range(ulen - 1):
-                        idx = self.dict_data_tr[user][timestep + 1:][:self.k]
+                        idx = seq[timestep + 1:][:self.k]
                         y_batch_s[0, timestep, idx] = 1.
                 elif self.pred_type == 'postfix':
                     for timestep in range(ulen - 1):
-                        idx = self.dict_data_tr[user][timestep + 1:]
+                        idx = seq[timestep + 1:]
                         y_batch_s[0, timestep, idx] = 1.
             else:
                 y_batch_s = torch.zeros(1, 1, self.num_items)
-                y_batch_s[0, 0, self.dict_data_te[user]] = 1.
+                idx = torch.from_numpy(np.asarray(self.dict_data_te[user], dtype=np.int64))
+                y_batch_s[0, 0, idx] = 1.
 
-            x_batch = [self.dict_data_tr[user][:-1]]
+            x_batch = seq[:-1].unsqueeze(0)
 
             #TODO check this
-            x = Variable(torch.LongTensor(x_batch))#.cuda()
+            x = Variable(x_batch)#.cuda()
             y = Variable(y_batch_s, requires_grad=False)#.cuda()
 
             yield x, y
@@ -6,9 +6,14 @@ import json
 import tempfile
 import pytest
 import numpy as np
+import pandas as pd
+import torch
+from scipy import sparse
 sys.path.insert(0, os.path.abspath('..'))
 
-from rectorch.data import DataProcessing, DataReader, DatasetManager
+from rectorch.data import DataProcessing, DataReader, DatasetManager, IdMap, SequenceStore,\
+    StackedCSR
+from rectorch.samplers import ConditionedDataSampler, SVAE_Sampler
 from rectorch.configuration import DataConfig
 
 def test_DataProcessing():
@@ -97,6 +102,16 @@ def test_DataProcessing():
         assert ttr_gt == ttr_file, "the content of test_tr.csv should be %s" %ttr_gt
         assert tte_gt == tte_file, "the content of test_te.csv should be %s" %tte_gt
 
+        assert np.all(dp.iid_index.get_indexer([3, 2, 5]) == np.array([2, 0, 1]))
+        assert np.all(dp.uid_index[[3, 0]] == np.array([3, 2])), "reverse lookup should work"
+        assert dp.i2id == {2: 0, 5: 1, 3: 2}, "i2id should map raw to inner item ids"
+        assert dp.u2id == {2: 0, 4: 1, 1: 2, 3: 3}, "u2id should map raw to inner user ids"
+        assert dp.i2id is dp.i2id, "i2id should be built only once"
+        dp.iid_index = dp.iid_index.append(pd.Index([7]))
+        assert dp.i2id == {2: 0, 5: 1, 3: 2, 7: 3}, "i2id should follow iid_index"
+        dp.u2id = {"b": 1, "a": 0}
+        assert list(dp.uid_index) == ["a", "b"] and dp.u2id == {"a": 0, "b": 1}
+
         dp2 = DataProcessing(DataConfig(tmp_d.name))
         assert dp2.cfg == dp.cfg, "dp and dp2 should be equal"
 
@@ -188,6 +203,14 @@ def test_DataReader():
         assert np.all(r == np.array([0]))
         assert np.all(c == np.array([1]))
 
+        for dtype in ["float32", "bool", "uint8"]:
+            reader.cfg.dtype = dtype
+            sp_train = reader.load_data("train")
+            sp_vtr, sp_vte = reader.load_data("validation")
+            assert sp_train.dtype == np.dtype(dtype), "sp_train should be of type %s" %dtype
+            assert sp_vtr.dtype == sp_vte.dtype == np.dtype(dtype)
+            assert sp_train.indices.dtype == np.int32, "indices should be int32"
+
 
 def test_DatasetManager():
     """Test for the DatasetManager class
@@ -277,6 +300,19 @@ def test_DatasetManager():
         assert np.all(r == np.array([3]))
         assert np.all(c == np.array([1]))
 
+        man = DatasetManager(tmp_d.name)
+        assert not man._sets, "the sets should be loaded on first access"
+        assert man.test_set[1] is man.test_set[1], "the sets should be cached"
+        assert list(man._sets) == ["test"]
+        man.release("test")
+        assert not man._sets, "the test set should be released"
+        assert (man.test_set[1] != sp_tte).nnz == 0
+        man.validation_set
+        man.release()
+        assert not man._sets, "all the sets should be released"
+        with pytest.raises(ValueError):
+            man.release("full")
+
 
 def test_nontopn():
     """Test for the module when topn=0
@@ -422,3 +458,1108 @@ def test_DataReaderAsDict():
         assert d_full[1] == [2, 1], "d_full[1] should be [2,1]"
         assert d_full[2] == [0, 1], "d_full[2] should be [0,1]"
         assert d_full[3] == [0, 1], "d_full[3] should be [0,1]"
+
+        s_train = reader.load_data_as_sequences("train")
+        s_vtr, s_vte = reader.load_data_as_sequences("validation")
+        assert isinstance(s_train, SequenceStore), "s_train should be a SequenceStore"
+        assert len(s_train) == 2, "s_train should contain 2 users"
+        assert s_train.items.dtype == np.int32, "items should be stored as int32"
+        assert np.all(s_train.offsets == np.array([0, 2, 4]))
+        assert np.all(s_train[1] == np.array([2, 1])), "s_train[1] should be [2,1]"
+        assert np.all(s_vtr[0] == np.array([0])) and np.all(s_vte[0] == np.array([1]))
+        assert s_train.to_dict() == d_train, "to_dict should be the same as load_data_as_dict"
+
+        sampler_d = SVAE_Sampler(3, d_train, pred_type="postfix", shuffle=False)
+        sampler_s = SVAE_Sampler(3, s_train, pred_type="postfix", shuffle=False)
+        for (x_d, y_d), (x_s, y_s) in zip(sampler_d, sampler_s):
+            assert torch.all(x_d == x_s) and torch.all(y_d == y_s)
+
+
+def test_binary():
+    """Test for the binary CSR format of the pre-processed splits
+    """
+    tmp = tempfile.NamedTemporaryFile()
+    with open(tmp.name, "w") as f:
+        f.write("1 1 4\n1 2 5\n1 3 2\n1 5 4\n")
+        f.write("2 2 3\n2 3 1\n2 5 4\n")
+        f.write("3 1 5\n3 2 5\n3 4 3\n3 5 4\n")
+        f.write("4 1 1\n4 3 4\n4 4 2\n4 5 4\n")
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "separator": " ",
+            "u_min": 1,
+            "i_min": 1,
+            "heldout": 1,
+            "test_prop": 0.5,
+            "topn": 0,
+            "binary": 1
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+
+        dp = DataProcessing(tmp_d.name)
+        dp.process()
+        files = set(os.listdir(tmp_folder))
+        for split in ['train', 'validation_tr', 'validation_te', 'test_tr', 'test_te']:
+            for ext in ['.json', '.indptr.npy', '.indices.npy', '.data.npy']:
+                assert split + ext in files, "%s should have been created" %(split + ext)
+
+        reader = DataReader(tmp_d.name)
+        cfg_csv = DataConfig(tmp_d.name)
+        cfg_csv.binary = 0
+        reader_csv = DataReader(cfg_csv)
+
+        cfg_mmap = DataConfig(tmp_d.name)
+        cfg_mmap.mmap = 1
+        reader_mmap = DataReader(cfg_mmap)
+        sp_mmap = reader_mmap.load_data("train")
+        assert not sp_mmap.data.flags.writeable, "memory-mapped data should be read-only"
+        assert not sp_mmap.indices.flags.writeable, "memory-mapped indices should be read-only"
+        assert (sp_mmap != reader.load_data("train")).nnz == 0
+
+        for datatype in ["train", "validation", "test", "full"]:
+            sp_bin = reader.load_data(datatype)
+            sp_csv = reader_csv.load_data(datatype)
+            if datatype in ["train", "full"]:
+                sp_bin, sp_csv = [sp_bin], [sp_csv]
+            for b, c in zip(sp_bin, sp_csv):
+                assert b.shape == c.shape, "binary and csv shapes should be the same"
+                assert (b != c).nnz == 0, "binary and csv matrices should be the same"
+
+
+def test_process_cache():
+    """Test for the fingerprint-based cache of the pre-processing
+    """
+    tmp = tempfile.NamedTemporaryFile()
+    with open(tmp.name, "w") as f:
+        f.write("1 1 4\n1 2 5\n1 3 2\n1 5 4\n")
+        f.write("2 2 3\n2 3 1\n2 5 4\n")
+        f.write("3 1 5\n3 2 5\n3 4 3\n3 5 4\n")
+        f.write("4 1 1\n4 3 4\n4 4 2\n4 5 4\n")
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "separator": " ",
+            "u_min": 1,
+            "i_min": 1,
+            "heldout": 1,
+            "test_prop": 0.5,
+            "topn": 1
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+
+        dp = DataProcessing(tmp_d.name)
+        dp.process()
+        assert "fingerprint.json" in os.listdir(tmp_folder), "fingerprint.json should exist"
+        u2id, i2id = dp.u2id, dp.i2id
+        train_path = os.path.join(tmp_folder, "train.csv")
+        os.remove(os.path.join(tmp_folder, "unique_uid.txt"))
+        dp.process()
+        assert os.path.isfile(os.path.join(tmp_folder, "unique_uid.txt")),\
+            "missing files should trigger the pre-processing"
+
+        with open(train_path, "w") as t:
+            t.write("cached")
+        dp.process()
+        assert open(train_path).read() == "cached", "the pre-processing should be skipped"
+        assert len(dp.u2id) == 4 and len(dp.i2id) == 3, "id maps should be loaded from the cache"
+        assert dp.u2id == u2id and dp.i2id == i2id, "cached raw ids should keep their type"
+
+        dp.process(force=True)
+        assert open(train_path).read() != "cached", "the pre-processing should be forced"
+
+        with open(train_path, "w") as t:
+            t.write("cached")
+        dp.invalidate()
+        assert "fingerprint.json" not in os.listdir(tmp_folder)
+        dp.process()
+        assert open(train_path).read() != "cached", "the cache should have been invalidated"
+
+        with open(train_path, "w") as t:
+            t.write("cached")
+        dp.cfg.update(mmap=1, n_jobs=2, proxy=0.5, proxy_buckets=2)
+        dp.process()
+        assert open(train_path).read() == "cached",\
+            "loading options should not invalidate the cache"
+
+        dp.cfg.test_prop = 0.4
+        dp.process()
+        assert open(train_path).read() != "cached",\
+            "a new configuration should invalidate the cache"
+
+
+def test_split_train_test():
+    """Test for the per-user heldout split of DataProcessing
+    """
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": "NOT USED",
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 0,
+            "u_min": 1,
+            "i_min": 1,
+            "heldout": 1,
+            "test_prop": 0.3,
+            "topn": 1
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        dp = DataProcessing(tmp_d.name)
+
+        np.random.seed(0)
+        users = np.repeat(np.arange(50), np.random.randint(1, 20, size=50))
+        np.random.shuffle(users)
+        data = pd.DataFrame({"u": users, "i": np.arange(len(users))})
+        data_tr, data_te = dp._split_train_test(data)
+        data_tr2, data_te2 = dp._split_train_test(data)
+
+        assert data_tr.equals(data_tr2) and data_te.equals(data_te2), "split should be reproducible"
+        assert not set(data_tr["i"]) & set(data_te["i"]), "train and test should be disjoint"
+
+        counts = data.groupby("u").size()
+        te_counts = data_te.groupby("u").size()
+        tr_counts = data_tr.groupby("u").size()
+        for u, n in counts.items():
+            if n == 1:
+                assert u not in te_counts and u not in tr_counts, "users with 1 rating are skipped"
+            else:
+                assert te_counts[u] == max(int(0.3 * n), 1)
+                assert tr_counts[u] == n - te_counts[u]
+
+
+def test_process_chunks():
+    """Test for the chunked pre-processing of DataProcessing
+    """
+    np.random.seed(1)
+    tmp = tempfile.NamedTemporaryFile()
+    with open(tmp.name, "w") as f:
+        for u in range(40):
+            for i in np.random.choice(30, np.random.randint(1, 15), replace=False):
+                f.write("u%d,i%d,%d,%d\n" %(u, i, np.random.randint(1, 6), np.random.randint(1e6)))
+
+    for topn, binary, kcore, shards in [(1, 0, 0, None), (0, 1, 1, None), (1, 1, 0, 3)]:
+        with tempfile.TemporaryDirectory() as dir_mem, tempfile.TemporaryDirectory() as dir_chk:
+            cfg_d = {
+                "data_path": tmp.name,
+                "proc_path": dir_mem,
+                "seed": 42,
+                "threshold": 1.5,
+                "separator": ",",
+                "u_min": 3,
+                "i_min": 2,
+                "heldout": 5,
+                "test_prop": 0.2,
+                "topn": topn,
+                "binary": binary,
+                "kcore": kcore,
+                "shards": shards
+            }
+            tmp_d = tempfile.NamedTemporaryFile()
+            json.dump(cfg_d, open(tmp_d.name, "w"))
+            DataProcessing(tmp_d.name).process()
+
+            cfg_d["proc_path"] = dir_chk
+            cfg_d["memory_budget"] = 0.01
+            json.dump(cfg_d, open(tmp_d.name, "w"))
+            dp = DataProcessing(tmp_d.name)
+            assert dp._chunk_size() < 100, "the chunks should be smaller than the data set"
+            dp.process()
+
+            files = set(os.listdir(dir_mem)) - {"fingerprint.json"}
+            assert files == set(os.listdir(dir_chk)) - {"fingerprint.json"}
+            for name in files:
+                with open(os.path.join(dir_mem, name), "rb") as f_mem:
+                    with open(os.path.join(dir_chk, name), "rb") as f_chk:
+                        assert f_mem.read() == f_chk.read(), "%s should be the same" %name
+
+
+def test_filter_kcore():
+    """Test for the k-core filtering of DataProcessing
+    """
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": "NOT USED",
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "u_min": 3,
+            "i_min": 4,
+            "heldout": 1,
+            "kcore": 1
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        dp = DataProcessing(tmp_d.name)
+
+        np.random.seed(0)
+        data = pd.DataFrame({"u": np.random.randint(60, size=500),
+                             "i": np.random.randint(80, size=500)}).drop_duplicates()
+        kdata, ucnt, icnt = dp._filter(data, 3, 4)
+
+        expected = data
+        while True:
+            icnt_ = expected.groupby("i").size()
+            ucnt_ = expected.groupby("u").size()
+            keep = expected["i"].isin(icnt_.index[icnt_ >= 4])
+            keep &= expected["u"].isin(ucnt_.index[ucnt_ >= 3])
+            if keep.all():
+                break
+            expected = expected[keep]
+
+        assert kdata.equals(expected), "the k-core should be the fixed point of the filtering"
+        assert np.all(ucnt == expected.groupby("u").size())
+        assert np.all(icnt == expected.groupby("i").size())
+        assert ucnt.min() >= 3 and icnt.min() >= 4
+
+
+def test_temporal_split():
+    """Test for the chronological split of DataReader
+    """
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        with open(os.path.join(tmp_folder, "unique_iid.txt"), "w") as f:
+            f.write("1\n")
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": "NOT USED",
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "heldout": 1,
+            "test_prop": 0.25
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        reader = DataReader(tmp_d.name)
+
+        np.random.seed(0)
+        n = 300
+        data = pd.DataFrame({"uid": np.random.randint(20, size=n),
+                             "iid": np.arange(n),
+                             "timestamp": np.random.permutation(n)})
+        data_tr, data_te = reader._split_train_test(data, "timestamp")
+
+        for u, group in data.groupby("uid"):
+            group = group.sort_values("timestamp")
+            sz = max(int(0.25 * len(group)), 1)
+            assert list(data_te[data_te.uid == u].iid) == list(group.iid[-sz:])
+            assert list(data_tr[data_tr.uid == u].iid) == list(group.iid[:-sz])
+
+
+def test_append():
+    """Test for the incremental ingestion of DataProcessing
+    """
+    tmp = tempfile.NamedTemporaryFile()
+    with open(tmp.name, "w") as f:
+        f.write("1 1 4\n1 2 5\n1 3 2\n1 5 4\n")
+        f.write("2 2 3\n2 3 1\n2 5 4\n")
+        f.write("3 1 5\n3 2 5\n3 4 3\n3 5 4\n")
+        f.write("4 1 1\n4 3 4\n4 4 2\n4 5 4\n")
+
+    tmp_new = tempfile.NamedTemporaryFile()
+    with open(tmp_new.name, "w") as f:
+        f.write("2 4 5\n9 2 4\n9 7 5\n1 3 5\n4 2 1\n")
+
+    for binary in [0, 1]:
+        with tempfile.TemporaryDirectory() as tmp_folder:
+            tmp_d = tempfile.NamedTemporaryFile()
+            cfg_d = {
+                "data_path": tmp.name,
+                "proc_path": tmp_folder,
+                "seed": 42,
+                "threshold": 2.5,
+                "separator": " ",
+                "u_min": 1,
+                "i_min": 1,
+                "heldout": 1,
+                "test_prop": 0.5,
+                "topn": 1,
+                "binary": binary
+            }
+            json.dump(cfg_d, open(tmp_d.name, "w"))
+
+            dp = DataProcessing(tmp_d.name)
+            dp.process()
+            dp.append(tmp_new.name)
+
+            assert "train.delta-1.csv" in os.listdir(tmp_folder)
+            with open(os.path.join(tmp_folder, "train.delta-1.csv"), "r") as t:
+                assert t.read() == 'uid,iid\n0,3\n4,0\n4,4\n'
+            with open(os.path.join(tmp_folder, "unique_iid.txt"), "r") as t:
+                assert t.read() == '2\n5\n3\n4\n7\n'
+            with open(os.path.join(tmp_folder, "unique_uid.txt"), "r") as t:
+                assert t.read() == '2\n4\n1\n3\n9\n'
+
+            reader = DataReader(tmp_d.name)
+            assert reader.n_items == 5, "number of items should be 5"
+            sp_train = reader.load_data("train")
+            sp_vtr, _ = reader.load_data("validation")
+            assert sp_train.shape == (3, 5) and sp_vtr.shape == (1, 5)
+            r, c = sp_train.nonzero()
+            assert np.all(r == np.array([0, 0, 0, 1, 1, 2, 2])), "new users follow training users"
+            assert np.all(c == np.array([0, 1, 3, 1, 2, 0, 4]))
+            assert np.all(reader.train_uids == np.array([0, 1, 4])), "rows should map to uids"
+            s_train = reader.load_data_as_sequences("train", None)
+            d_train = reader.load_data_as_dict("train", None)
+            assert len(s_train) == len(d_train) == 3 and s_train[2].tolist() == [0, 4]
+            sampler_d = SVAE_Sampler(5, d_train, pred_type="postfix", shuffle=False)
+            sampler_s = SVAE_Sampler(5, s_train, pred_type="postfix", shuffle=False)
+            batches = list(zip(sampler_d, sampler_s))
+            assert len(batches) == 3, "the sampler should iterate over the training users"
+            for (x_d, y_d), (x_s, y_s) in batches:
+                assert torch.all(x_d == x_s) and torch.all(y_d == y_s)
+            train, test = DatasetManager(tmp_d.name).get_train_and_test()
+            assert train.shape[0] == test.shape[0] == 5, "each user should be listed once"
+            full, full_dict = reader.load_data("full"), reader.load_data_as_dict("full", None)
+            assert full_dict[4] == [0, 4]
+            assert full.shape[0] == len(full_dict) == 5
+            for uid, items in full_dict.items():
+                assert full[uid].indices.tolist() == sorted(items), "full views should agree"
+
+            dp.process(force=True)
+            assert "train.delta-1.csv" not in os.listdir(tmp_folder)
+            assert "deltas.json" not in os.listdir(tmp_folder)
+            assert DataReader(tmp_d.name).load_data("train").shape == (2, 3)
+
+
+def test_parquet():
+    """Test for the pre-processing of parquet data sets
+    """
+    pq = pytest.importorskip("pyarrow.parquet")
+    import pyarrow as pa
+
+    np.random.seed(2)
+    n = 400
+    data = pd.DataFrame({"session": np.random.randint(1e6, size=n),
+                         "user": np.random.randint(30, size=n),
+                         "item": np.random.randint(25, size=n),
+                         "rating": np.random.randint(1, 6, size=n).astype(float),
+                         "page": ["p%d" %i for i in range(n)]}).drop_duplicates(["user", "item"])
+    tmp_pq = tempfile.NamedTemporaryFile(suffix=".parquet")
+    pq.write_table(pa.Table.from_pandas(data, preserve_index=False), tmp_pq.name,
+                   row_group_size=50)
+    tmp_csv = tempfile.NamedTemporaryFile()
+    data[["user", "item", "rating"]].to_csv(tmp_csv.name, index=False)
+
+    with tempfile.TemporaryDirectory() as dir_pq, tempfile.TemporaryDirectory() as dir_csv:
+        cfg_d = {
+            "data_path": tmp_csv.name,
+            "proc_path": dir_csv,
+            "seed": 42,
+            "threshold": 2.5,
+            "header": 0,
+            "u_min": 2,
+            "i_min": 2,
+            "heldout": 3,
+            "test_prop": 0.2,
+            "topn": 0
+        }
+        tmp_d = tempfile.NamedTemporaryFile()
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        DataProcessing(tmp_d.name).process()
+
+        cfg_d["data_path"] = tmp_pq.name
+        cfg_d["proc_path"] = dir_pq
+        cfg_d["columns"] = ["user", "item", "rating"]
+        for budget in [None, 0.01]:
+            cfg_d["memory_budget"] = budget
+            json.dump(cfg_d, open(tmp_d.name, "w"))
+            dp = DataProcessing(tmp_d.name)
+            assert list(dp._read_raw(nrows=10).columns) == ["user", "item", "rating"]
+            assert len(dp._read_raw(nrows=70)) == 70
+            dp.process(force=True)
+
+            for name in set(os.listdir(dir_csv)) - {"fingerprint.json"}:
+                with open(os.path.join(dir_csv, name), "rb") as f_csv:
+                    with open(os.path.join(dir_pq, name), "rb") as f_pq:
+                        assert f_csv.read() == f_pq.read(), "%s should be the same" %name
+
+def test_multichar_separator():
+    """Test for the parallel parsing of raw data with a multi-character separator
+    """
+    np.random.seed(3)
+    n = 500
+    data = pd.DataFrame({"user": np.random.randint(40, size=n),
+                         "item": np.random.randint(30, size=n),
+                         "rating": np.random.randint(1, 6, size=n),
+                         "timestamp": np.random.randint(1e9, size=n)})
+    tmp = tempfile.NamedTemporaryFile()
+    with open(tmp.name, "w") as f:
+        f.write("\n".join("::".join(map(str, row)) for row in data.values) + "\n")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmpdir,
+            "seed": 42,
+            "threshold": 2.5,
+            "separator": "::",
+            "header": None,
+            "u_min": 2,
+            "i_min": 2,
+            "heldout": 3,
+            "test_prop": 0.2,
+            "topn": 0,
+            "n_jobs": 3
+        }
+        tmp_d = tempfile.NamedTemporaryFile()
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        dp = DataProcessing(tmp_d.name)
+        expected = pd.read_csv(tmp.name, sep="::", header=None, engine="python")
+        parsed = dp._read_raw()
+        assert parsed.equals(expected), "the parsed data should be the same"
+        chunks = pd.concat(list(dp._iter_raw(60)), ignore_index=True)
+        assert chunks.equals(expected[expected[2] > 2.5].reset_index(drop=True))
+
+        with open(tmp.name, "w") as f:
+            f.write("u::i::r::t\n")
+            f.write("\n".join("::".join(map(str, row)) for row in data.values) + "\n")
+        cfg_d["header"] = 0
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        dp = DataProcessing(tmp_d.name)
+        parsed = dp._read_raw()
+        assert list(parsed.columns) == ["u", "i", "r", "t"]
+        assert np.array_equal(parsed.values, data.values)
+
+        # ISBN-like item ids which are numeric only in the first ranges of the file
+        with open(tmp.name, "w") as f:
+            f.write("".join("%d::100::5::%d\n" % (u, u) for u in range(30)))
+            f.write("".join("%d::10X::5::%d\n" % (u, u) for u in range(30)))
+        cfg_d["header"] = None
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        parsed = DataProcessing(tmp_d.name)._read_raw()
+        expected = pd.read_csv(tmp.name, sep="::", header=None, engine="python")
+        assert sorted(parsed[1].unique()) == ["100", "10X"], "the item ids should be strings"
+        assert parsed.equals(expected)
+
+def test_id_maps():
+    """Test for the binary id mappings
+    """
+    tmp = tempfile.NamedTemporaryFile()
+    with open(tmp.name, "w") as f:
+        f.write("1 1 4\n1 2 5\n1 3 2\n1 5 4\n")
+        f.write("2 2 3\n2 3 1\n2 5 4\n")
+        f.write("3 1 5\n3 2 5\n3 4 3\n3 5 4\n")
+        f.write("4 1 1\n4 3 4\n4 4 2\n4 5 4\n")
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "separator": " ",
+            "u_min": 1,
+            "i_min": 1,
+            "heldout": 1,
+            "test_prop": 0.5,
+            "topn": 0,
+            "mmap": 1
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        DataProcessing(tmp_d.name).process()
+
+        with open(os.path.join(tmp_folder, "unique_iid.txt")) as f:
+            raw_iids = [line.strip() for line in f]
+        reader = DataReader(tmp_d.name)
+        assert reader.n_items == len(raw_iids)
+
+        umap, imap = reader.load_id_maps()
+        assert isinstance(imap.ids, np.memmap), "the id mapping should be memory-mapped"
+        assert len(umap) == 4
+        assert imap.to_raw(np.arange(len(imap))).tolist() == raw_iids
+        assert np.array_equal(imap.to_inner(raw_iids), np.arange(len(raw_iids)))
+        assert np.array_equal(imap.to_inner([int(raw_iids[1]), "unk"]), [1, -1])
+        assert np.array_equal(umap.to_inner(umap.to_raw([3, 0])), [3, 0])
+
+        # saving the mapping again replaces the memory-mapped file instead of overwriting it
+        path = os.path.join(tmp_folder, "unique_iid.npy")
+        inode = os.stat(path).st_ino
+        IdMap.from_index(pd.Index(["x"])).save(tmp_folder, "unique_iid")
+        assert os.stat(path).st_ino != inode, "the mapping should be replaced"
+        assert imap.to_raw(np.arange(len(imap))).tolist() == raw_iids
+
+    idmap = IdMap.from_index(pd.Index(["a", "bb", "ç"]))
+    assert idmap.to_raw([2, 0]).tolist() == ["ç", "a"]
+    assert np.array_equal(idmap.to_inner(["bb", "ç"]), [1, 2])
+    assert len(IdMap.from_index([])) == 0
+
+def test_shards():
+    """Test for the sharded layout of the pre-processed splits
+    """
+    np.random.seed(4)
+    n = 600
+    data = pd.DataFrame({"user": np.random.randint(60, size=n),
+                         "item": np.random.randint(30, size=n),
+                         "rating": np.random.randint(1, 6, size=n)})
+    tmp = tempfile.NamedTemporaryFile()
+    data.drop_duplicates(["user", "item"]).to_csv(tmp.name, index=False, header=False)
+    tmp_new = tempfile.NamedTemporaryFile()
+    with open(tmp_new.name, "w") as f:
+        f.write("100,1,5\n101,2,4\n")
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "u_min": 2,
+            "i_min": 2,
+            "heldout": 10,
+            "test_prop": 0.3,
+            "topn": 0,
+            "shards": 3
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        dp = DataProcessing(tmp_d.name)
+        dp.process()
+        assert "shards.json" in os.listdir(tmp_folder)
+
+        def check_shards():
+            full = DataReader(tmp_d.name)
+            readers = [DataReader(tmp_d.name, (k, 3)) for k in range(3)]
+            for datatype in ["train", "validation", "test"]:
+                whole = full.load_data(datatype)
+                parts = [r.load_data(datatype) for r in readers]
+                if datatype == "train":
+                    whole, parts = [whole], [[p] for p in parts]
+                for i, matrix in enumerate(whole):
+                    stacked = sparse.vstack([p[i] for p in parts]).tocsr()
+                    assert stacked.shape == matrix.shape
+                    assert (stacked != matrix).nnz == 0, "the shards should cover the split"
+                rows = [r.shard_rows[datatype] for r in readers]
+                assert rows[0][0] == 0 and rows[-1][1] == whole[0].shape[0]
+                assert all(rows[k][1] == rows[k + 1][0] for k in range(2))
+            return readers[0]
+
+        reader = check_shards()
+        n_train = DataReader(tmp_d.name).load_data("train").shape[0]
+        assert reader.load_data("train").shape[0] < n_train
+        with pytest.raises(ValueError):
+            reader.load_data_as_sequences("train")
+        with pytest.raises(ValueError):
+            DataReader(tmp_d.name, (0, 2))
+        with pytest.raises(ValueError):
+            DataReader(tmp_d.name, (3, 3))
+
+        dp.append(tmp_new.name)
+        check_shards()
+
+        cfg_d["proxy"] = 0.5
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        dp = DataProcessing(tmp_d.name)
+        for update in [dp.process, lambda: dp.append(tmp_new.name)]:
+            update()
+            rows = json.load(open(os.path.join(tmp_folder, "shards.json")))["rows"]
+            cfg_full = DataConfig(tmp_d.name)
+            cfg_full.proxy = None
+            full = DataReader(cfg_full)
+            assert rows["train"][-1] == full.load_data("train").shape[0]
+            for datatype in ["validation", "test"]:
+                assert rows[datatype][-1] == full.load_data(datatype)[0].shape[0],\
+                    "the shards should not be down-sampled by the proxy"
+        del cfg_d["proxy"]
+
+        del cfg_d["shards"]
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        DataProcessing(tmp_d.name).process()
+        assert not [name for name in os.listdir(tmp_folder) if "shard" in name]
+
+
+def test_stacked_csr():
+    """Test for the StackedCSR view
+    """
+    blocks = [sparse.random(5, 6, density=0.4, format="csr", random_state=k) for k in range(3)]
+    blocks.append(sparse.csr_matrix((2, 6)))
+    stacked = StackedCSR(blocks)
+    full = sparse.vstack(blocks, format="csr")
+
+    assert stacked.shape == full.shape == (17, 6)
+    assert stacked.nnz == full.nnz
+    for rows in [3, [16, 0, 7, 7, 12], slice(4, 11), np.arange(17) % 3 == 0, [], -1]:
+        assert (stacked[rows] != full[rows]).nnz == 0, "the gathered rows should be the same"
+    r, c = stacked.nonzero()
+    r_full, c_full = full.nonzero()
+    assert np.array_equal(r, r_full) and np.array_equal(c, c_full)
+    assert np.allclose(stacked.toarray(), full.toarray())
+    assert (stacked.tocsr() != full).nnz == 0
+    assert np.allclose(stacked.gram().toarray(), full.T.dot(full).toarray())
+    dense = np.random.rand(6, 4)
+    assert np.allclose(stacked.dot(dense), full.dot(dense))
+    assert np.allclose(stacked.dot(sparse.csr_matrix(dense)).toarray(), full.dot(dense))
+    assert np.allclose(stacked.sum(axis=0), full.sum(axis=0))
+    assert np.allclose(stacked.sum(axis=1), full.sum(axis=1))
+    assert np.isclose(stacked.sum(), full.sum())
+
+    with pytest.raises(ValueError):
+        StackedCSR([sparse.csr_matrix((2, 3)), sparse.csr_matrix((2, 4))])
+
+def test_profile():
+    """Test for the profiling of the pre-processed data set
+    """
+    tmp = tempfile.NamedTemporaryFile()
+    with open(tmp.name, "w") as f:
+        f.write("1 1 4\n1 2 5\n1 3 2\n1 5 4\n")
+        f.write("2 2 3\n2 3 1\n2 5 4\n")
+        f.write("3 1 5\n3 2 5\n3 4 3\n3 5 4\n")
+        f.write("4 1 1\n4 3 4\n4 4 2\n4 5 4\n")
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "separator": " ",
+            "u_min": 1,
+            "i_min": 1,
+            "heldout": 1,
+            "test_prop": 0.5,
+            "topn": 0
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        dp = DataProcessing(tmp_d.name)
+        dp.process()
+
+        reader = DataReader(tmp_d.name)
+        profile = reader.profile()
+        assert "profile.json" in os.listdir(tmp_folder), "the profile should be cached"
+        assert profile["users"] == 4 and profile["items"] == 3
+        assert profile["nnz"] == 8
+        assert np.isclose(profile["density"], 8 / 12)
+        assert profile["splits"] == {"train": [2, 4], "validation": [1, 2], "test": [1, 2]}
+        assert profile["user_degree"]["max"] == 2 and profile["user_degree"]["min"] == 2
+        assert profile["item_degree"]["min"] == 1 and profile["item_degree"]["max"] == 4
+        assert np.isclose(profile["item_degree"]["mean"], 8 / 3)
+        assert np.isclose(profile["memory"]["gram"], 9 * 8 / 2**20)
+        assert "suggestions" not in profile
+
+        profile["nnz"] = -1
+        json.dump(profile, open(os.path.join(tmp_folder, "profile.json"), "w"))
+        assert reader.profile()["nnz"] == -1, "the cached profile should be used"
+        assert reader.profile(force=True)["nnz"] == 8
+
+        suggestions = reader.profile(ram_budget=1)["suggestions"]
+        assert suggestions["batch_size"] == 2, "the batch size is capped to the training users"
+        assert suggestions["ease"] and suggestions["admm_slim"]
+        suggestions = reader.profile(ram_budget=1e-5)["suggestions"]
+        assert suggestions["batch_size"] == 1 and not suggestions["ease"]
+        profile = reader.profile()
+        profile["splits"]["train"][0] = 3
+        json.dump(profile, open(os.path.join(tmp_folder, "profile.json"), "w"))
+        suggestions = reader.profile(ram_budget=1)["suggestions"]
+        assert suggestions["batch_size"] == 2, "the batch size should be a power of two"
+
+        dp.process(force=True)
+        assert "profile.json" not in os.listdir(tmp_folder), "the cache should be removed"
+
+def test_process_temporal_split():
+    """Test for the temporal split of the validation and test users
+    """
+    np.random.seed(5)
+    n = 400
+    data = pd.DataFrame({"user": np.random.randint(30, size=n),
+                         "item": np.random.randint(40, size=n),
+                         "rating": np.random.randint(3, 6, size=n),
+                         "timestamp": np.random.permutation(n)})
+    data = data.drop_duplicates(["user", "item"])
+    tmp = tempfile.NamedTemporaryFile()
+    data.to_csv(tmp.name, index=False, header=False)
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "u_min": 3,
+            "i_min": 1,
+            "heldout": 5,
+            "test_prop": 0.25,
+            "topn": 0,
+            "split": "temporal"
+        }
+        for leave_last in [None, 2]:
+            cfg_d["leave_last"] = leave_last
+            json.dump(cfg_d, open(tmp_d.name, "w"))
+            DataProcessing(tmp_d.name).process(force=True)
+
+            for name in ["validation", "test"]:
+                data_tr = pd.read_csv(os.path.join(tmp_folder, name + "_tr.csv"))
+                data_te = pd.read_csv(os.path.join(tmp_folder, name + "_te.csv"))
+                for u, group in pd.concat([data_tr, data_te]).groupby("uid"):
+                    group = group.sort_values("3")
+                    sz = leave_last or max(int(0.25 * len(group)), 1)
+                    assert list(data_te[data_te.uid == u].iid) == list(group.iid[-sz:])
+                    assert list(data_tr[data_tr.uid == u].iid) == list(group.iid[:-sz])
+
+                reader = DataReader(tmp_d.name)
+                reader._split_train_test = None
+                s_tr, s_te = reader.load_data_as_sequences(name, "3")
+                assert sum(len(s_te[u]) for u in range(len(s_te))) == len(data_te)
+                assert s_tr.items.tolist() == data_tr.sort_values(["uid", "3"]).iid.tolist()
+
+        cfg_d["split"] = "unknown"
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        with pytest.raises(ValueError):
+            DataProcessing(tmp_d.name).process(force=True)
+
+def test_process_variants():
+    """Test for the generation of several splits with a single parse of the data
+    """
+    np.random.seed(6)
+    n = 500
+    data = pd.DataFrame({"user": np.random.randint(40, size=n),
+                         "item": np.random.randint(30, size=n),
+                         "rating": np.random.randint(1, 6, size=n)})
+    tmp = tempfile.NamedTemporaryFile()
+    data.drop_duplicates(["user", "item"]).to_csv(tmp.name, index=False, header=False)
+
+    with tempfile.TemporaryDirectory() as tmp_folder, tempfile.TemporaryDirectory() as single:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "u_min": 2,
+            "i_min": 2,
+            "heldout": 5,
+            "test_prop": 0.3,
+            "topn": 1
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        dp = DataProcessing(tmp_d.name)
+        with pytest.raises(ValueError):
+            dp.process_variants()
+        with pytest.raises(ValueError):
+            dp.process_variants(seeds=[1], n_folds=2)
+
+        cfgs = dp.process_variants(seeds=[1, 7])
+        assert [c.seed for c in cfgs] == [1, 7]
+        assert sorted(os.listdir(tmp_folder)) == ["seed-1", "seed-7"]
+
+        cfg_d.update(seed=7, proc_path=single)
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        DataProcessing(tmp_d.name).process()
+        for name in set(os.listdir(single)) - {"fingerprint.json"}:
+            with open(os.path.join(single, name), "rb") as f_single:
+                with open(os.path.join(tmp_folder, "seed-7", name), "rb") as f_var:
+                    assert f_single.read() == f_var.read(), "%s should be the same" %name
+
+        dp._read_filtered = None
+        dp.process_variants(seeds=[1, 7])
+        del dp._read_filtered
+
+        cfgs = dp.process_variants(n_folds=3)
+        test_users = []
+        for cfg in cfgs:
+            with open(os.path.join(cfg.proc_path, "unique_uid.txt")) as f:
+                uids = [line.strip() for line in f]
+            te_uids = pd.read_csv(os.path.join(cfg.proc_path, "test_te.csv"))["uid"].unique()
+            test_users.append({uids[u] for u in te_uids})
+            n_train = DataReader(cfg).load_data("train").shape[0]
+            assert n_train == len(uids) - 10
+        assert all(test_users), "every fold should have test users"
+        for i in range(3):
+            for j in range(i + 1, 3):
+                assert not test_users[i] & test_users[j], "the test users should not overlap"
+
+def test_proxy():
+    """Test for the stratified proxy data set of DataReader
+    """
+    np.random.seed(7)
+    n = 3000
+    data = pd.DataFrame({"user": np.random.zipf(1.5, size=n) % 300,
+                         "item": np.random.randint(50, size=n),
+                         "rating": np.random.randint(1, 6, size=n)})
+    tmp = tempfile.NamedTemporaryFile()
+    data.drop_duplicates(["user", "item"]).to_csv(tmp.name, index=False, header=False)
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 0,
+            "u_min": 1,
+            "i_min": 1,
+            "heldout": 20,
+            "test_prop": 0.2,
+            "topn": 1
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        DataProcessing(tmp_d.name).process()
+        full = DataReader(tmp_d.name)
+
+        cfg = DataConfig(tmp_d.name)
+        cfg.proxy = 0.25
+        cfg.proxy_buckets = 4
+        reader = DataReader(cfg)
+        train, sp_full = reader.load_data("train"), full.load_data("train")
+        assert train.shape[1] == sp_full.shape[1], "the item catalog should be the same"
+        rows = reader.proxy_rows["train"]
+        assert train.shape[0] == len(rows) and abs(len(rows) - sp_full.shape[0] / 4) <= 4
+        assert (train != sp_full[rows]).nnz == 0
+        other = DataReader(cfg)
+        other.load_data("train")
+        assert np.array_equal(rows, other.proxy_rows["train"]), "the sample should be reproducible"
+
+        activity = np.diff(sp_full.indptr)
+        buckets = np.array_split(np.sort(activity), 4)
+        for low, high in zip([b[0] for b in buckets], [b[-1] for b in buckets]):
+            n_full = np.sum((activity >= low) & (activity <= high))
+            n_proxy = np.sum((activity[rows] >= low) & (activity[rows] <= high))
+            assert n_proxy > 0 and n_proxy <= n_full
+
+        vtr, vte = reader.load_data("validation")
+        full_vtr, full_vte = full.load_data("validation")
+        rows = reader.proxy_rows["validation"]
+        assert (vtr != full_vtr[rows]).nnz == 0 and (vte != full_vte[rows]).nnz == 0
+        assert reader.load_data("full").shape[1] == full.n_items
+
+def test_load_item_conditions():
+    """Test for the loading of the items' side information
+    """
+    tmp = tempfile.NamedTemporaryFile()
+    with open(tmp.name, "w") as f:
+        f.write("1 1 4\n1 2 5\n1 3 2\n1 5 4\n")
+        f.write("2 2 3\n2 3 1\n2 5 4\n")
+        f.write("3 1 5\n3 2 5\n3 4 3\n3 5 4\n")
+        f.write("4 1 1\n4 3 4\n4 4 2\n4 5 4\n")
+    tmp_side = tempfile.NamedTemporaryFile()
+    with open(tmp_side.name, "w") as f:
+        f.write("1::Title 1::Drama|Comedy\n2::Title 2::Comedy\n")
+        f.write("5::Title 5::Action|Drama|Drama\n9::Title 9::Horror\n")
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "separator": " ",
+            "u_min": 1,
+            "i_min": 1,
+            "heldout": 1,
+            "test_prop": 0.5,
+            "topn": 1
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        DataProcessing(tmp_d.name).process()
+
+        reader = DataReader(tmp_d.name)
+        matrix, conds = reader.load_item_conditions(tmp_side.name, sep="::", cond_sep="|")
+        assert list(conds) == ["Action", "Comedy", "Drama", "Horror"]
+        assert matrix.shape == (reader.n_items, 4)
+        with open(os.path.join(tmp_folder, "unique_iid.txt")) as f:
+            raw_iids = [line.strip() for line in f]
+        expected = {"1": [1, 2], "2": [1], "5": [0, 2]}
+        for iid, raw in enumerate(raw_iids):
+            assert matrix[iid].indices.tolist() == expected.get(raw, [])
+        assert np.all(matrix.data == 1), "repeated conditions should be counted once"
+
+        train = reader.load_data("train")
+        iid2cids = {i: expected.get(raw, []) for i, raw in enumerate(raw_iids)}
+        sampler_d = ConditionedDataSampler(iid2cids, 4, train, batch_size=2, shuffle=False)
+        sampler_m = ConditionedDataSampler(matrix, 4, train, batch_size=2, shuffle=False)
+        assert np.array_equal(sampler_d.examples, sampler_m.examples)
+        for (tr_d, te_d), (tr_m, te_m) in zip(sampler_d, sampler_m):
+            assert torch.all(tr_d == tr_m) and torch.all(te_d == te_m)
+
+def test_load_data_csc():
+    """Test for the item-major matrices of DataReader
+    """
+    tmp = tempfile.NamedTemporaryFile()
+    with open(tmp.name, "w") as f:
+        f.write("1 1 4\n1 2 5\n1 3 2\n1 5 4\n")
+        f.write("2 2 3\n2 3 1\n2 5 4\n")
+        f.write("3 1 5\n3 2 5\n3 4 3\n3 5 4\n")
+        f.write("4 1 1\n4 3 4\n4 4 2\n4 5 4\n")
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "separator": " ",
+            "u_min": 1,
+            "i_min": 1,
+            "heldout": 1,
+            "test_prop": 0.5,
+            "topn": 1,
+            "dtype": "float32"
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        dp = DataProcessing(tmp_d.name)
+        dp.process()
+
+        reader = DataReader(tmp_d.name)
+        with pytest.raises(ValueError):
+            reader.load_data_csc("training")
+        for datatype in ["train", "validation", "test", "full"]:
+            sp_csc = reader.load_data_csc(datatype)
+            sp_csr = reader.load_data(datatype)
+            if datatype in ["train", "full"]:
+                sp_csc, sp_csr = [sp_csc], [sp_csr]
+            for c, r in zip(sp_csc, sp_csr):
+                assert c.format == "csc" and c.dtype == np.float32
+                assert (c != r).nnz == 0, "the item-major matrix should be the same"
+        assert "train.csc.json" in os.listdir(tmp_folder), "the CSC matrix should be saved"
+
+        cfg = DataConfig(tmp_d.name)
+        cfg.mmap = 1
+        sp_csc = DataReader(cfg).load_data_csc()
+        assert sp_csc.format == "csc" and not sp_csc.indices.flags.writeable
+        assert (sp_csc != reader.load_data("train")).nnz == 0
+
+        # a concurrent writer replaces the files, it does not overwrite the memory-mapped ones
+        path = os.path.join(tmp_folder, "train.csc.indices.npy")
+        inode = os.stat(path).st_ino
+        os.remove(os.path.join(tmp_folder, "train.csc.json"))
+        DataReader(tmp_d.name).load_data_csc()
+        assert os.stat(path).st_ino != inode, "the cached matrix should be replaced"
+        assert not [name for name in os.listdir(tmp_folder) if ".tmp-" in name]
+        assert (sp_csc != reader.load_data("train")).nnz == 0
+
+        dp.process(force=True)
+        assert not [name for name in os.listdir(tmp_folder) if ".csc." in name]
+
+
+def test_compression(monkeypatch):
+    """Test for the compressed binary splits
+    """
+    np.random.seed(5)
+    n = 600
+    data = pd.DataFrame({"user": np.random.randint(60, size=n),
+                         "item": np.random.randint(40, size=n),
+                         "rating": np.random.randint(1, 6, size=n)})
+    tmp = tempfile.NamedTemporaryFile()
+    data.drop_duplicates(["user", "item"]).to_csv(tmp.name, index=False, header=False)
+
+    # small blocks so that each array is split in several compressed blocks
+    monkeypatch.setattr("rectorch.data._BLOCK_SIZE", 64)
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_d = tempfile.NamedTemporaryFile()
+        cfg_d = {
+            "data_path": tmp.name,
+            "proc_path": tmp_folder,
+            "seed": 42,
+            "threshold": 2.5,
+            "u_min": 2,
+            "i_min": 2,
+            "heldout": 10,
+            "test_prop": 0.3,
+            "topn": 0,
+            "dtype": "float32",
+            "binary": 1,
+            "compression": "zlib",
+            "shards": 2
+        }
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        DataProcessing(tmp_d.name).process()
+        files = set(os.listdir(tmp_folder))
+        for split in ['train', 'validation_tr', 'test_te', 'train.shard-1']:
+            for arr in ['indptr', 'indices', 'data']:
+                assert "%s.%s.zlib" % (split, arr) in files
+                assert "%s.%s.npy" % (split, arr) not in files
+
+        cfg_csv = DataConfig(tmp_d.name)
+        cfg_csv.binary = 0
+        cfg_mmap = DataConfig(tmp_d.name)
+        cfg_mmap.mmap = 1
+        reader, reader_csv = DataReader(cfg_mmap), DataReader(cfg_csv)
+        for datatype in ["train", "validation", "test", "full"]:
+            sp_bin = reader.load_data(datatype)
+            sp_csv = reader_csv.load_data(datatype)
+            if datatype in ["train", "full"]:
+                sp_bin, sp_csv = [sp_bin], [sp_csv]
+            for b, c in zip(sp_bin, sp_csv):
+                assert b.shape == c.shape and b.dtype == c.dtype
+                assert (b != c).nnz == 0, "compressed and csv matrices should be the same"
+        shard = DataReader(tmp_d.name, (1, 2))
+        start = shard.shard_rows["train"][0]
+        assert (shard.load_data("train") != reader.load_data("train")[start:]).nnz == 0
+        assert (reader.load_data_csc() != reader.load_data("train")).nnz == 0
+        assert "train.csc.indices.zlib" in os.listdir(tmp_folder)
+
+        # the block size is read from the header
+        monkeypatch.setattr("rectorch.data._BLOCK_SIZE", 1 << 22)
+        assert (DataReader(tmp_d.name).load_data("train") != reader_csv.load_data("train")).nnz == 0
+
+        cfg_d["compression"] = "gzip"
+        json.dump(cfg_d, open(tmp_d.name, "w"))
+        with pytest.raises(ValueError):
+            DataProcessing(tmp_d.name).process()
+
+
+def test_load_full():
+    """Test for the single-read loading of the full data set
+    """
+    np.random.seed(6)
+    n = 600
+    data = pd.DataFrame({"user": np.random.randint(60, size=n),
+                         "item": np.random.randint(40, size=n),
+                         "rating": np.random.randint(1, 6, size=n)})
+    tmp = tempfile.NamedTemporaryFile()
+    data.drop_duplicates(["user", "item"]).to_csv(tmp.name, index=False, header=False)
+    tmp_new = tempfile.NamedTemporaryFile()
+    with open(tmp_new.name, "w") as f:
+        f.write("100,1,5\n101,2,4\n")
+
+    def stacked(reader):
+        tr = reader.load_data("train")
+        val_tr, val_te = reader.load_data("validation")
+        te_tr, te_te = reader.load_data("test")
+        # the appended users follow the validation and test users
+        head = tr.shape[0]
+        deltas = os.path.join(reader.cfg.proc_path, "deltas.json")
+        if os.path.isfile(deltas):
+            head = np.searchsorted(reader.train_uids, json.load(open(deltas))["train_users"])
+        return sparse.vstack([tr[:head], val_tr + val_te, te_tr + te_te, tr[head:]]).tocsr()
+
+    for binary, topn in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+        with tempfile.TemporaryDirectory() as tmp_folder:
+            tmp_d = tempfile.NamedTemporaryFile()
+            cfg_d = {
+                "data_path": tmp.name,
+                "proc_path": tmp_folder,
+                "seed": 42,
+                "threshold": 2.5,
+                "u_min": 2,
+                "i_min": 2,
+                "heldout": 10,
+                "test_prop": 0.3,
+                "topn": topn,
+                "binary": binary
+            }
+            json.dump(cfg_d, open(tmp_d.name, "w"))
+            dp = DataProcessing(tmp_d.name)
+            dp.process()
+
+            for append in [False, True]:
+                if append:
+                    dp.append(tmp_new.name)
+                cfg_proxy = DataConfig(tmp_d.name)
+                cfg_proxy.proxy = .5
+                for reader in [DataReader(tmp_d.name), DataReader(cfg_proxy)]:
+                    full, expected = reader.load_data("full"), stacked(reader)
+                    assert full.format == "csr" and full.has_canonical_format
+                    assert full.shape == expected.shape and full.dtype == expected.dtype
+                    assert (full != expected).nnz == 0, "the full matrix should stack the splits"
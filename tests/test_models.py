@@ -15,6 +15,7 @@ from rectorch.nets import MultiDAE_net, VAE_net, MultiVAE_net, CMultiVAE_net, CF
     CFGAN_G_net, SVAE_net
 from rectorch.samplers import DataSampler, ConditionedDataSampler, CFGAN_TrainingSampler,\
     SVAE_Sampler
+from rectorch.data import StackedCSR
 
 def test_RecSysModel():
     """Test the RecSysModel class
@@ -379,6 +380,16 @@ def test_EASE():
     os.remove(tmp.name + ".npy")
     assert repr(ease) == str(ease)
 
+    Xd = X.toarray()
+    G = np.dot(Xd.T, Xd) + 200. * np.eye(5)
+    P = np.linalg.inv(G)
+    B = P / (-np.diag(P))
+    B[np.diag_indices(5)] = 0
+    assert np.allclose(ease.model, np.dot(Xd, B)), "the model should be the same as the dense one"
+    for X_ in [X.tocsc(), X.astype(bool), Xd, StackedCSR([X[:4], X[4:]])]:
+        ease2.train(X_)
+        assert np.allclose(ease2.model, ease.model), "the data format should not matter"
+
 def test_CFGAN():
     """Test of the CFGAN class
     """
@@ -487,6 +498,14 @@ def test_ADMM_Slim():
     slim2 = ADMM_Slim(nn_constr=False, l1_penalty=False, item_bias=True)
     slim2.train(X)
 
+    for bias in [False, True]:
+        slim = ADMM_Slim(item_bias=bias)
+        slim.train(X)
+        for X_ in [X.tocsc(), X.toarray(), StackedCSR([X[:4], X[4:]])]:
+            slim2 = ADMM_Slim(item_bias=bias)
+            slim2.train(X_)
+            assert np.allclose(slim2.model, slim.model), "the data format should not matter"
+
 
 def test_SVAE():
     """Test the SVAE class
@@ -48,6 +48,11 @@ def test_DataSampler():
         else:
             assert np.all(t.numpy() == np.array([0, 1, 1])), "the tensor t should be [0, 1, 1]"
 
+    sampler = DataSampler(train.astype(bool), batch_size=2, shuffle=False)
+    for t, _ in sampler:
+        assert isinstance(t, torch.FloatTensor), "t should be of type torch.FloatTensor"
+        assert np.all(t.numpy() == np.array([[1, 1, 0], [0, 1, 1]]))
+
     sampler = DataSampler(val_tr, val_te, batch_size=1, shuffle=True)
     assert len(sampler) == 1, "the number of batches should be 1"
 